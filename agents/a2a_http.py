@@ -0,0 +1,64 @@
+# agents/a2a_http.py - Flask helpers shared by the A2A agent servers
+import orjson
+from flask.json.provider import DefaultJSONProvider
+from loguru import logger
+from python_a2a import run_server
+from python_a2a.server.http import create_flask_app
+
+try:
+    from waitress import serve as waitress_serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
+WAITRESS_THREADS = 8
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to Flask's stdlib provider.
+
+    Objects orjson can't encode natively (Decimal, dates, ...) go through Flask's
+    default hook, and anything orjson still rejects (e.g. ints beyond 64 bits) or
+    calls with formatting kwargs such as indent are handed to the stdlib encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+            except orjson.JSONEncodeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # DefaultJSONProvider.response always passes separators/indent, which would
+        # route every jsonify() through the stdlib fallback; orjson output is compact.
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj), mimetype=self.mimetype)
+
+
+# Paths that served the agent card before the agents moved onto python_a2a's app
+DISCOVERY_PATHS = ('/', '/a2a', '/.well-known/agent.json')
+
+
+def bind_discovery_views(app, view) -> None:
+    """Point python_a2a's GET views for the discovery paths at the agent's card view."""
+    for rule in app.url_map.iter_rules():
+        if rule.rule in DISCOVERY_PATHS and 'GET' in rule.methods:
+            app.view_functions[rule.endpoint] = view
+
+
+def serve_agent(agent, host: str, port: int) -> None:
+    """Serve python_a2a's Flask app for an agent with waitress, blocking until shutdown.
+
+    Falls back to python_a2a's run_server (the Werkzeug dev server) when waitress
+    isn't installed.
+    """
+    if not WAITRESS_AVAILABLE:
+        logger.warning("waitress not installed, serving with the Flask development server")
+        run_server(agent, host=host, port=port)
+        return
+    waitress_serve(create_flask_app(agent), host=host, port=port, threads=WAITRESS_THREADS)
@@ -1,17 +1,107 @@
-# agents/news_agent/news_agent.py - FIXED version with proper Flask/A2A integration
+# agents/news_agent/news_agent.py - discovery endpoints served by the A2A server itself
 from python_a2a import A2AServer, skill, agent, run_server, TaskStatus, TaskState
-from flask import Flask, jsonify, request
+from flask import Response, jsonify, request
 from loguru import logger
 import asyncio
-import json
+import hashlib
+import orjson
 import re
-from typing import Dict, Any, Optional
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 import threading
 import time
 
 from agents.news_agent.news_client import NewsAPIClient
+from agents.a2a_http import ORJSONProvider, bind_discovery_views
 from config.settings import settings
-from protocols.communication import comm_manager
+
+
+# Persistent event loop for running skill coroutines from the synchronous
+# handle_task, so the aiohttp session and connection pool survive across tasks.
+_task_loop = asyncio.new_event_loop()
+threading.Thread(target=_task_loop.run_forever, name="news-agent-loop", daemon=True).start()
+
+# Intent extraction tables, compiled once at import instead of per task
+_CATEGORIES = {
+    'business': ['business', 'finance', 'economy', 'market', 'stock', 'trade'],
+    'entertainment': ['entertainment', 'celebrity', 'movie', 'music', 'show', 'film'],
+    'general': ['general', 'world', 'global', 'international'],
+    'health': ['health', 'medical', 'medicine', 'covid', 'pandemic', 'wellness'],
+    'science': ['science', 'research', 'study', 'discovery', 'scientific'],
+    'sports': ['sports', 'football', 'basketball', 'soccer', 'tennis', 'olympics', 'game'],
+    'technology': ['technology', 'tech', 'ai', 'artificial intelligence', 'computer', 'software', 'digital']
+}
+
+# One alternation with a named group per category; match.lastgroup is the category.
+# Keywords match on word boundaries (allowing a plural "s") so e.g. "said" is not "ai".
+_CATEGORY_RE = re.compile(
+    "|".join(
+        rf"\b(?P<{category}>{'|'.join(map(re.escape, keywords))})s?\b"
+        for category, keywords in _CATEGORIES.items()
+    ),
+    re.IGNORECASE
+)
+
+_KEYWORD_PATTERNS = [
+    re.compile(r'(?:about|on|regarding)\s+([a-zA-Z\s]+?)(?:\s|$|\?|!|\.)', re.IGNORECASE),
+    re.compile(r'news\s+([a-zA-Z\s]+?)(?:\s|$|\?|!|\.)', re.IGNORECASE),
+]
+_KEYWORD_CLEAN_RE = re.compile(r'\b(news|latest|recent|today|headlines)\b', re.IGNORECASE)
+
+_COUNTRIES = {
+    'us': ['usa', 'america', 'united states', 'us'],
+    'uk': ['uk', 'britain', 'united kingdom', 'england'],
+    'ca': ['canada', 'canadian'],
+    'au': ['australia', 'australian'],
+    'de': ['germany', 'german'],
+    'fr': ['france', 'french'],
+    'in': ['india', 'indian'],
+    'jp': ['japan', 'japanese'],
+    'br': ['brazil', 'brazilian'],
+    'cn': ['china', 'chinese']
+}
+_COUNTRY_LOOKUP = {alias: code for code, aliases in _COUNTRIES.items() for alias in aliases}
+_COUNTRY_MAX_WORDS = max(len(alias.split()) for alias in _COUNTRY_LOOKUP)
+_WORD_RE = re.compile(r"[a-z]+")
+
+_ARTICLE_TEMPLATE = "🔸 **{title}**\n   📍 Source: {source}\n{description}   🔗 {url}\n"
+
+
+def _fmt_article(article: Dict[str, Any]) -> str:
+    """Format a single NewsAPI article as a multi-line block."""
+    article_get = article.get
+    description = article_get("description", "")
+    return _ARTICLE_TEMPLATE.format_map({
+        "title": article_get("title", "No Title"),
+        "source": article_get("source", {}).get("name", "Unknown Source"),
+        "description": f"   📝 {description[:150]}...\n" if description and len(description) > 10 else "",
+        "url": article_get("url", "#"),
+    })
+
+
+def _iter_news_lines(category: Optional[str], keyword: Optional[str], country: str, data: Dict[str, Any]) -> Iterator[str]:
+    """Yield the news response one block at a time (header, then one per article)."""
+    articles = data.get("articles", [])
+    if not articles:
+        search_params = []
+        if category:
+            search_params.append(f"category '{category}'")
+        if keyword:
+            search_params.append(f"keyword '{keyword}'")
+        yield f"📰 No news articles found for {' and '.join(search_params)} in {country.upper()}."
+        return
+
+    search_desc = ""
+    if category and keyword:
+        search_desc = f"'{keyword}' in {category} category"
+    elif category:
+        search_desc = f"{category} category"
+    elif keyword:
+        search_desc = f"'{keyword}'"
+
+    yield f"📰 Latest news for {search_desc} ({country.upper()}):\n"
+    for article in islice(articles, 5):  # Limit to top 5 articles
+        yield _fmt_article(article)
 
 
 @agent(
@@ -20,78 +110,59 @@ from protocols.communication import comm_manager
     version="1.0.0"
 )
 class NewsAgent(A2AServer):
-    
     def __init__(self):
         """Initialize the news agent with API client."""
         super().__init__()
-        self.news_client = NewsAPIClient(settings.NEWS_API_KEY, comm_manager)
-        self.flask_app = None
-        self.flask_port = None
-        self.a2a_port = None
+        self.news_client = NewsAPIClient(settings.NEWS_API_KEY, settings.NEWS_API_BASE_URL)
+        self.port = None
+        # The agent card is static, so build and serialize it once instead of per request
+        self._agent_card = self.get_agent_card()
+        self._card_bytes = orjson.dumps(self._agent_card)
+        self._card_etag = f'"{hashlib.blake2b(self._card_bytes, digest_size=8).hexdigest()}"'
         logger.info("NewsAgent initialized with decorator-based A2A protocol.")
     
-    def create_flask_app(self):
-        """Create Flask app for HTTP endpoints with proper JSON responses."""
-        app = Flask(__name__)
+    def setup_routes(self, app):
+        """Register the A2A routes plus discovery aliases on the A2A server's Flask app."""
+        super().setup_routes(app)
+        app.json = ORJSONProvider(app)
         
-        # Disable template auto-reloading and set JSON as default
-        app.config['TEMPLATES_AUTO_RELOAD'] = False
-        app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+        # Cached agent card data
+        agent_card = self._agent_card
+        card_bytes = self._card_bytes
+        card_etag = self._card_etag
+        card_headers = {'ETag': card_etag, 'Cache-Control': 'public, max-age=60'}
         
-        # Get agent card data
-        agent_card = self.get_agent_card()
+        def card_response():
+            """Return the cached agent card, or 304 if the client already has it."""
+            if request.headers.get('If-None-Match') == card_etag:
+                return Response(status=304, headers=card_headers)
+            return Response(card_bytes, mimetype='application/json', headers=card_headers)
         
-        @app.route('/', methods=['GET'])
-        def index():
-            """Root endpoint returns agent card."""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
-        
-        @app.route('/.well-known/agent.json', methods=['GET'])
-        def well_known_agent():
-            """Standard A2A discovery endpoint."""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
-        
-        @app.route('/a2a', methods=['GET'])
-        def a2a_endpoint():
-            """A2A protocol endpoint."""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+        # python_a2a already binds GET "/", "/a2a" and "/.well-known/agent.json" to its
+        # generic UI/card views; serve our cached card on all of them instead.
+        bind_discovery_views(app, card_response)
         
         @app.route('/agent-card', methods=['GET'])
         def agent_card_endpoint():
             """Agent card endpoint."""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+            return card_response()
         
         @app.route('/info', methods=['GET'])
         def info():
             """Info endpoint."""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+            return card_response()
+        
+        # Everything but the timestamp is fixed once the server is set up
+        health_prefix = (
+            b'{"status":"healthy","agent":"News Agent","version":"1.0.0","port":'
+            + orjson.dumps(self.port)
+            + b',"timestamp":'
+        )
         
         @app.route('/health', methods=['GET'])
         def health():
             """Health check endpoint."""
-            health_data = {
-                "status": "healthy",
-                "agent": "News Agent",
-                "version": "1.0.0",
-                "timestamp": time.time(),
-                "ports": {
-                    "flask": self.flask_port,
-                    "a2a": self.a2a_port
-                }
-            }
-            response = jsonify(health_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+            return Response(health_prefix + orjson.dumps(time.time()) + b'}', mimetype='application/json')
         
         @app.route('/test', methods=['GET'])
         def test_endpoint():
@@ -101,59 +172,7 @@ class NewsAgent(A2AServer):
                 "agent": agent_card,
                 "test_time": time.time()
             }
-            response = jsonify(test_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response
-        
-        # Error handlers to ensure JSON responses
-        @app.errorhandler(404)
-        def not_found(error):
-            error_data = {
-                "error": "Not Found",
-                "message": "The requested endpoint was not found",
-                "available_endpoints": [
-                    "/", "/.well-known/agent.json", "/a2a", 
-                    "/agent-card", "/info", "/health", "/test"
-                ]
-            }
-            response = jsonify(error_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response, 404
-        
-        @app.errorhandler(500)
-        def internal_error(error):
-            error_data = {
-                "error": "Internal Server Error",
-                "message": "An internal error occurred"
-            }
-            response = jsonify(error_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response, 500
-        
-        @app.errorhandler(Exception)
-        def handle_exception(e):
-            """Handle all other exceptions with JSON response."""
-            logger.error(f"Flask error: {e}", exc_info=True)
-            error_data = {
-                "error": "Server Error",
-                "message": str(e)
-            }
-            response = jsonify(error_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response, 500
-        
-        # CORS and Content-Type headers
-        @app.after_request
-        def after_request(response):
-            response.headers.add('Access-Control-Allow-Origin', '*')
-            response.headers.add('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-            response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-            # Ensure Content-Type is application/json for all responses
-            if not response.headers.get('Content-Type'):
-                response.headers['Content-Type'] = 'application/json'
-            return response
-        
-        return app
+            return jsonify(test_data)
     
     def get_agent_card(self):
         """Return the agent card for discovery."""
@@ -161,9 +180,8 @@ class NewsAgent(A2AServer):
             agent_config = settings.load_agent_config("news_agent")
             base_port = settings.get_agent_port("news_agent") or 5313
             
-            # Use Flask port for external access
-            flask_port = base_port
-            base_url = f"http://127.0.0.1:{flask_port}"
+            # Discovery and A2A tasks share the same port
+            base_url = f"http://127.0.0.1:{base_port}"
             
             return {
                 "id": "news_agent_001",
@@ -175,14 +193,14 @@ class NewsAgent(A2AServer):
                 "type": "agent",
                 "protocol": "a2a",
                 "capabilities": {
-                    "streaming": False,
+                    "streaming": True,
                     "pushNotifications": False
                 },
                 "endpoints": {
                     "discovery": f"{base_url}/.well-known/agent.json",
                     "a2a": f"{base_url}/a2a",
-                    "task": f"{base_url}/task",
-                    "status": f"{base_url}/status",
+                    "task": f"{base_url}/tasks/send",
+                    "status": f"{base_url}/tasks/get",
                     "health": f"{base_url}/health",
                     "test": f"{base_url}/test"
                 },
@@ -234,20 +252,56 @@ class NewsAgent(A2AServer):
         description="Get latest news articles by category, keyword, or country",
         tags=["news", "articles", "headlines", "current"]
     )
-    async def get_latest_news(self, category: Optional[str] = None, keyword: Optional[str] = None, country: str = "us") -> str:
-        """Get latest news articles."""
+    async def get_latest_news(self, category: Union[str, List[str], None] = None, keyword: Optional[str] = None, country: str = "us") -> str:
+        """Get latest news articles, fetching several categories concurrently."""
         try:
             logger.info(f"Getting news - category: {category}, keyword: {keyword}, country: {country}")
             
             if not category and not keyword:
                 return "Please specify either a category or keyword to search for news."
             
+            categories = [category] if isinstance(category, str) else list(category or [])
+            if len(categories) > 1:
+                results = await self.news_client.get_many_headlines(
+                    [{"category": c, "q": keyword, "country": country} for c in categories]
+                )
+                return "\n".join(
+                    self._format_news_response(c, keyword, country, news_data)
+                    for c, news_data in zip(categories, results)
+                )
+            
+            category = categories[0] if categories else None
             news_data = await self.news_client.get_top_headlines(category=category, q=keyword, country=country)
             return self._format_news_response(category, keyword, country, news_data)
         except Exception as e:
             logger.error(f"Error getting news: {e}")
             return f"Sorry, I couldn't get news information. Please try again."
 
+    async def stream_news(self, category: Optional[str] = None, keyword: Optional[str] = None, country: str = "us") -> AsyncIterator[str]:
+        """Yield the formatted news response chunk by chunk instead of as one string."""
+        # The shared aiohttp session lives on the persistent task loop
+        news_data = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            self.news_client.get_top_headlines(category=category, q=keyword, country=country), _task_loop
+        ))
+        for chunk in _iter_news_lines(category, keyword, country, news_data):
+            yield chunk + "\n"
+
+    async def stream_response(self, message):
+        """Stream news for python_a2a's streaming endpoint."""
+        text = getattr(message.content, "text", "") or ""
+        text_lower = text.lower()
+        categories = self._extract_category_from_text(text_lower)
+        keyword = self._extract_keyword_from_text(text_lower)
+        country = self._extract_country_from_text(text_lower)
+        
+        if not categories and not keyword:
+            yield "Please specify a news category or keyword. Examples: 'technology news', 'news about climate change', 'business headlines'"
+            return
+        
+        for category in categories or [None]:
+            async for chunk in self.stream_news(category, keyword, country):
+                yield chunk
+
     def handle_task(self, task):
         """Handle incoming A2A tasks with natural language processing."""
         try:
@@ -272,11 +326,11 @@ class NewsAgent(A2AServer):
                 return task
             
             # Parse the request
-            category = self._extract_category_from_text(text.lower())
+            categories = self._extract_category_from_text(text.lower())
             keyword = self._extract_keyword_from_text(text.lower())
             country = self._extract_country_from_text(text.lower())
             
-            if not category and not keyword:
+            if not categories and not keyword:
                 task.status = TaskStatus(
                     state=TaskState.INPUT_REQUIRED,
                     message={
@@ -290,7 +344,10 @@ class NewsAgent(A2AServer):
                 return task
             
             # Get news
-            news_response = asyncio.run(self.get_latest_news(category, keyword, country))
+            future = asyncio.run_coroutine_threadsafe(
+                self.get_latest_news(categories, keyword, country), _task_loop
+            )
+            news_response = future.result(timeout=15)
             
             # Create successful response
             task.artifacts = [{
@@ -313,38 +370,19 @@ class NewsAgent(A2AServer):
         
         return task
 
-    def _extract_category_from_text(self, text: str) -> Optional[str]:
-        """Extract news category from text."""
-        categories = {
-            'business': ['business', 'finance', 'economy', 'market', 'stock', 'trade'],
-            'entertainment': ['entertainment', 'celebrity', 'movie', 'music', 'show', 'film'],
-            'general': ['general', 'world', 'global', 'international'],
-            'health': ['health', 'medical', 'medicine', 'covid', 'pandemic', 'wellness'],
-            'science': ['science', 'research', 'study', 'discovery', 'scientific'],
-            'sports': ['sports', 'football', 'basketball', 'soccer', 'tennis', 'olympics', 'game'],
-            'technology': ['technology', 'tech', 'ai', 'artificial intelligence', 'computer', 'software', 'digital']
-        }
-        
-        for category, keywords in categories.items():
-            if any(keyword in text for keyword in keywords):
-                return category
-        
-        return None
+    def _extract_category_from_text(self, text: str) -> List[str]:
+        """Extract all news categories mentioned in text, in first-occurrence order."""
+        return list(dict.fromkeys(match.lastgroup for match in _CATEGORY_RE.finditer(text)))
 
     def _extract_keyword_from_text(self, text: str) -> Optional[str]:
         """Extract search keyword from text."""
         # Look for "about X" or "on X" patterns
-        patterns = [
-            r'(?:about|on|regarding)\s+([a-zA-Z\s]+?)(?:\s|$|\?|!|\.)',
-            r'news\s+([a-zA-Z\s]+?)(?:\s|$|\?|!|\.)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _KEYWORD_PATTERNS:
+            match = pattern.search(text)
             if match:
                 keyword = match.group(1).strip()
                 # Clean up common words
-                keyword = re.sub(r'\b(news|latest|recent|today|headlines)\b', '', keyword, flags=re.IGNORECASE).strip()
+                keyword = _KEYWORD_CLEAN_RE.sub('', keyword).strip()
                 if keyword and len(keyword) > 2:
                     return keyword
         
@@ -352,64 +390,25 @@ class NewsAgent(A2AServer):
 
     def _extract_country_from_text(self, text: str) -> str:
         """Extract country code from text."""
-        countries = {
-            'us': ['usa', 'america', 'united states', 'us'],
-            'uk': ['uk', 'britain', 'united kingdom', 'england'],
-            'ca': ['canada', 'canadian'],
-            'au': ['australia', 'australian'],
-            'de': ['germany', 'german'],
-            'fr': ['france', 'french'],
-            'in': ['india', 'indian'],
-            'jp': ['japan', 'japanese'],
-            'br': ['brazil', 'brazilian'],
-            'cn': ['china', 'chinese']
-        }
-        
-        for code, names in countries.items():
-            if any(name in text for name in names):
-                return code
+        tokens = _WORD_RE.findall(text)
+        lookup = _COUNTRY_LOOKUP.get
+        join = " ".join
+        for i in range(len(tokens)):
+            # Try multi-word aliases ("united kingdom") before single tokens
+            for size in range(_COUNTRY_MAX_WORDS, 0, -1):
+                code = lookup(join(tokens[i:i + size]))
+                if code:
+                    return code
         
         return "us"  # Default
 
     def _format_news_response(self, category: Optional[str], keyword: Optional[str], country: str, data: Dict[str, Any]) -> str:
         """Format news response."""
-        articles = data.get("articles", [])
-        if not articles:
-            search_params = []
-            if category:
-                search_params.append(f"category '{category}'")
-            if keyword:
-                search_params.append(f"keyword '{keyword}'")
-            return f"📰 No news articles found for {' and '.join(search_params)} in {country.upper()}."
-
-        search_desc = ""
-        if category and keyword:
-            search_desc = f"'{keyword}' in {category} category"
-        elif category:
-            search_desc = f"{category} category"
-        elif keyword:
-            search_desc = f"'{keyword}'"
-        
-        response_lines = [f"📰 Latest news for {search_desc} ({country.upper()}):\n"]
-        
-        for i, article in enumerate(articles[:5]):  # Limit to top 5 articles
-            title = article.get("title", "No Title")
-            source = article.get("source", {}).get("name", "Unknown Source")
-            url = article.get("url", "#")
-            description = article.get("description", "")
-            
-            response_lines.append(f"🔸 **{title}**")
-            response_lines.append(f"   📍 Source: {source}")
-            if description and len(description) > 10:
-                response_lines.append(f"   📝 {description[:150]}...")
-            response_lines.append(f"   🔗 {url}")
-            response_lines.append("")
-        
-        return "\n".join(response_lines)
+        return "\n".join(_iter_news_lines(category, keyword, country, data))
 
 
 async def start_news_agent():
-    """Start the news agent with separate Flask and A2A servers."""
+    """Start the news agent, serving discovery and A2A tasks from one server."""
     try:
         agent_config = settings.load_agent_config("news_agent")
         if not agent_config:
@@ -417,55 +416,31 @@ async def start_news_agent():
     except Exception as e:
         logger.warning(f"Could not load agent config: {e}, using defaults.")
 
-    base_port = None
+    port = None
     try:
-        base_port = settings.get_agent_port("news_agent") or 5313
+        port = settings.get_agent_port("news_agent") or 5313
     except Exception as e:
-        logger.warning(f"Could not get agent port: {e}, using default 5003")
-        base_port = 5313
-    
-    # Use same port for Flask (for discovery) and A2A communication
-    flask_port = base_port
-    a2a_port = base_port + 100  # Use different port for A2A server to avoid conflicts
+        logger.warning(f"Could not get agent port: {e}, using default 5313")
+        port = 5313
     
     agent = NewsAgent()
-    agent.flask_port = flask_port
-    agent.a2a_port = a2a_port
+    agent.port = port
     
     logger.info(f"News Agent configuration:")
-    logger.info(f"  Flask (Discovery) Port: {flask_port}")
-    logger.info(f"  A2A Server Port: {a2a_port}")
-    
-    # Create and start Flask app for discovery
-    flask_app = agent.create_flask_app()
-    
-    def run_flask():
-        try:
-            logger.info(f"Starting Flask discovery server on port {flask_port}")
-            flask_app.run(
-                host='127.0.0.1', 
-                port=flask_port, 
-                debug=False, 
-                use_reloader=False,
-                threaded=True
-            )
-        except Exception as e:
-            logger.error(f"Flask server error: {e}")
-    
-    # Start Flask in background thread
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start()
-    
-    # Give Flask time to start
-    await asyncio.sleep(2)
-    logger.info(f"✅ Flask discovery server started on http://127.0.0.1:{flask_port}")
+    logger.info(f"  Port: {port}")
+    logger.info(f"  Discovery URL: http://127.0.0.1:{port}/.well-known/agent.json")
+    logger.info(f"  A2A URL: http://127.0.0.1:{port}/a2a")
     
-    # Start A2A server on different port
     try:
-        logger.info(f"Starting A2A server on port {a2a_port}...")
-        await run_server(agent, host="127.0.0.1", port=a2a_port)
+        logger.info(f"Starting A2A server on port {port}...")
+        # run_server blocks in python_a2a's Flask server until shutdown
+        run_server(agent, host="127.0.0.1", port=port)
     except Exception as e:
         logger.error(f"Error starting A2A server: {e}")
+    finally:
+        await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(agent.news_client.close(), _task_loop)
+        )
 
 
 def main():
@@ -1,34 +1,81 @@
+import asyncio
 import aiohttp
-from typing import Optional, Dict, Any
+import orjson
+from functools import lru_cache
+from typing import Optional, Dict, Any, List
 from loguru import logger
+from yarl import URL
+
+
+_MAX_IN_FLIGHT = 8
+
+
+@lru_cache(maxsize=256)
+def _build_url(endpoint: str, api_key: str, category: Optional[str],
+               q: Optional[str], country: Optional[str]) -> URL:
+    """Build and cache the encoded top-headlines URL for a query."""
+    params = {"apiKey": api_key}
+    if country:
+        params["country"] = country
+    if category:
+        params["category"] = category
+    if q:
+        params["q"] = q
+    return URL(endpoint).with_query(params)
+
 
 class NewsAPIClient:
+    __slots__ = ('api_key', 'base_url', '_url', '_session', '_session_loop', '_sem')
+
     def __init__(self, api_key: str, base_url: str = "https://newsapi.org/v2"):
         self.api_key = api_key
         self.base_url = base_url
+        self._url = f"{base_url}/top-headlines"
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use in the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=_MAX_IN_FLIGHT, ttl_dns_cache=300, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+            self._sem = asyncio.Semaphore(_MAX_IN_FLIGHT)
+        return self._session
 
     async def get_top_headlines(self, category: Optional[str] = None,
                                 q: Optional[str] = None,
                                 country: Optional[str] = "us") -> Dict[str, Any]:
-        params = {
-            "apiKey": self.api_key,
-            "country": country,
-        }
-        if category:
-            params["category"] = category
-        if q:
-            params["q"] = q
-
-        url = f"{self.base_url}/top-headlines"
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, params=params) as resp:
+        return await self._fetch_one(category=category, q=q, country=country)
+
+    async def get_many_headlines(self, queries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fetch several top-headline queries concurrently over the shared session."""
+        return await asyncio.gather(*(self._fetch_one(**query) for query in queries))
+
+    async def _fetch_one(self, category: Optional[str] = None,
+                         q: Optional[str] = None,
+                         country: Optional[str] = "us") -> Dict[str, Any]:
+        url = _build_url(self._url, self.api_key, category, q, country)
+        session = await self._get_session()
+        try:
+            async with self._sem:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
                     if resp.status != 200:
                         text = await resp.text()
                         logger.error(f"NewsAPI returned {resp.status}: {text}")
                         return {}
-                    data = await resp.json()
+                    data = await resp.json(loads=orjson.loads)
                     return data
-            except Exception as e:
-                logger.error(f"Error fetching news: {e}")
-                return {}
+        except Exception as e:
+            logger.error(f"Error fetching news: {e}")
+            return {}
+
+    async def close(self):
+        """Close the underlying HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        self._sem = None
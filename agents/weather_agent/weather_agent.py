@@ -1,32 +1,57 @@
-# agents/weather_agent/weather_agent.py - FIXED version with proper port separation
+# agents/weather_agent/weather_agent.py - discovery endpoints served by the A2A server itself
 from python_a2a import A2AServer, skill, agent, run_server, TaskStatus, TaskState
-from flask import Flask, jsonify, request
+from flask import Response, jsonify
 from loguru import logger
 import asyncio
-import json
+import logging
+import orjson
 import re
 from typing import Dict, Any, Optional
 import threading
 import time
 import socket
-import requests
 
 from agents.weather_agent.weather_client import WeatherClient
+from agents.a2a_http import ORJSONProvider, bind_discovery_views
 from config.settings import settings
-from protocols.communication import comm_manager
+
+
+# Persistent event loop for running skill coroutines from the synchronous
+# handle_task, so the httpx client and connection pool survive across tasks.
+_task_loop = asyncio.new_event_loop()
+threading.Thread(target=_task_loop.run_forever, name="weather-agent-loop", daemon=True).start()
 
 
 def find_free_port(start_port: int = 5211) -> int:
-    """Find a free port starting from the given port."""
-    port = start_port
-    while port < start_port + 100:  # Try up to 100 ports
+    """Return start_port if it is free, otherwise a port assigned by the kernel."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(('127.0.0.1', port))
-                return port
+            s.bind(('127.0.0.1', start_port))
         except OSError:
-            port += 1
-    raise RuntimeError(f"Could not find free port starting from {start_port}")
+            s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+_LOCATION_PATTERNS = [
+    re.compile(r'(?:weather|forecast|conditions)\s+(?:in|for|at)\s+([a-zA-Z\s,]+?)(?:\s|$|\?|!|\.|,)', re.IGNORECASE),
+    re.compile(r'(?:in|for|at)\s+([a-zA-Z\s,]+?)(?:\s|$|\?|!|\.|weather|forecast)', re.IGNORECASE),
+    re.compile(r'([A-Z][a-zA-Z\s,]+?)(?:\s+weather|\s+forecast|\?|$)', re.IGNORECASE),
+]
+_LOCATION_CLEAN_RE = re.compile(r'\b(weather|forecast|conditions|current|today|tomorrow)\b', re.IGNORECASE)
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+# Any of these substrings marks a forecast request; one scan instead of one per word
+_FORECAST_RE = re.compile(r'forecast|tomorrow|next|future|upcoming|week|days', re.IGNORECASE)
+
+_WORD_NUMBERS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+                 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+_DAY_PATTERNS = [
+    (re.compile(r'(\d+)\s*(?:day|days)', re.IGNORECASE), lambda m: int(m.group(1))),
+    (re.compile(r'(one|two|three|four|five|six|seven|eight|nine|ten)\s*(?:day|days)', re.IGNORECASE),
+     lambda m: _WORD_NUMBERS.get(m.group(1), 3)),
+    (re.compile(r'week', re.IGNORECASE), lambda m: 7),
+    (re.compile(r'tomorrow', re.IGNORECASE), lambda m: 1),
+]
 
 
 @agent(
@@ -41,68 +66,39 @@ class WeatherAgent(A2AServer):
         super().__init__()
         self.weather_client = WeatherClient(
             settings.WEATHER_API_KEY, 
-            settings.WEATHER_API_BASE_URL, 
-            comm_manager
+            settings.WEATHER_API_BASE_URL
         )
-        self.flask_app = None
-        self.flask_port = None
-        self.a2a_port = None
+        self.port = None
+        self._agent_card = None
+        self._agent_card_bytes = None
         logger.info("WeatherAgent initialized with decorator-based A2A protocol.")
     
-    def create_flask_app(self):
-        """Create Flask app for A2A discovery with correct endpoint structure."""
-        app = Flask(__name__)
-        
-        # Disable template auto-reloading and set JSON as default
-        app.config['TEMPLATES_AUTO_RELOAD'] = False
-        app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
-        
-        # Suppress Flask development server warning
-        app.config['ENV'] = 'production'
-        
-        # Get agent card data
-        agent_card = self.get_agent_card()
+    def setup_routes(self, app):
+        """Register the A2A routes plus discovery aliases on the A2A server's Flask app."""
+        super().setup_routes(app)
+        app.json = ORJSONProvider(app)
         
-        @app.route('/', methods=['GET'])
-        def index():
-            """Root endpoint returns agent card."""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+        # The port is fixed by now, so build and serialize the agent card once
+        self._agent_card = agent_card = self.get_agent_card()
+        self._agent_card_bytes = card_bytes = orjson.dumps(agent_card)
         
-        @app.route('/.well-known/agent.json', methods=['GET'])
-        def well_known_agent():
-            """Standard A2A discovery endpoint - this is the key fix!"""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+        card_headers = {
+            'Content-Length': str(len(card_bytes)),
+            'Access-Control-Allow-Origin': '*'
+        }
         
-        @app.route('/a2a', methods=['GET'])
-        def a2a_info_endpoint():
-            """A2A info endpoint (discovery only - actual A2A server runs separately)."""
-            a2a_info = {
-                "agent": agent_card["name"],
-                "a2a_server_url": f"http://127.0.0.1:{self.a2a_port}/a2a",
-                "status": "discovery_service",
-                "message": "This is the discovery service. A2A task processing happens at the a2a_server_url."
-            }
-            response = jsonify(a2a_info)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+        def card_response():
+            """Return the pre-serialized agent card with its headers fixed up front."""
+            return Response(card_bytes, mimetype='application/json', headers=card_headers,
+                            direct_passthrough=True)
         
-        @app.route('/agent-card', methods=['GET'])
-        def agent_card_endpoint():
-            """Agent card endpoint."""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+        # python_a2a already binds GET "/", "/a2a" and "/.well-known/agent.json" to its
+        # generic UI/card views; serve our cached card on all of them instead.
+        bind_discovery_views(app, card_response)
         
-        @app.route('/info', methods=['GET'])
-        def info():
-            """Info endpoint."""
-            response = jsonify(agent_card)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+        # The other card aliases dispatch straight to the same view
+        app.add_url_rule('/agent-card', 'agent_card_endpoint', card_response, methods=['GET'])
+        app.add_url_rule('/info', 'info', card_response, methods=['GET'])
         
         @app.route('/health', methods=['GET'])
         def health():
@@ -111,87 +107,21 @@ class WeatherAgent(A2AServer):
                 "status": "healthy",
                 "agent": "Weather Agent",
                 "version": "1.0.0",
-                "timestamp": time.time(),
-                "services": {
-                    "flask_discovery": {
-                        "port": self.flask_port,
-                        "status": "running",
-                        "endpoints": ["/.well-known/agent.json", "/health", "/info"]
-                    },
-                    "a2a_server": {
-                        "port": self.a2a_port,
-                        "status": "running",
-                        "endpoint": f"http://127.0.0.1:{self.a2a_port}/a2a"
-                    }
-                }
+                "port": self.port,
+                "timestamp": time.time()
             }
-            response = jsonify(health_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response
+            return jsonify(health_data)
         
         @app.route('/test', methods=['GET'])
         def test_endpoint():
             """Test endpoint for diagnostics."""
             test_data = {
-                "message": "Weather Agent Discovery Service is running",
+                "message": "Weather Agent is running",
                 "agent": agent_card,
                 "test_time": time.time(),
-                "discovery_port": self.flask_port,
-                "a2a_port": self.a2a_port
-            }
-            response = jsonify(test_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response
-        
-        # Error handlers to ensure JSON responses
-        @app.errorhandler(404)
-        def not_found(error):
-            error_data = {
-                "error": "Not Found",
-                "message": "The requested endpoint was not found",
-                "available_endpoints": [
-                    "/", "/.well-known/agent.json", "/a2a", 
-                    "/agent-card", "/info", "/health", "/test"
-                ]
-            }
-            response = jsonify(error_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response, 404
-        
-        @app.errorhandler(500)
-        def internal_error(error):
-            error_data = {
-                "error": "Internal Server Error",
-                "message": "An internal error occurred"
+                "port": self.port
             }
-            response = jsonify(error_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response, 500
-        
-        @app.errorhandler(Exception)
-        def handle_exception(e):
-            """Handle all other exceptions with JSON response."""
-            logger.error(f"Flask error: {e}", exc_info=True)
-            error_data = {
-                "error": "Server Error",
-                "message": str(e)
-            }
-            response = jsonify(error_data)
-            response.headers['Content-Type'] = 'application/json'
-            return response, 500
-        
-        # CORS and Content-Type headers
-        @app.after_request
-        def after_request(response):
-            response.headers.add('Access-Control-Allow-Origin', '*')
-            response.headers.add('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-            response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-            # Ensure Content-Type is application/json for all responses
-            if not response.headers.get('Content-Type'):
-                response.headers['Content-Type'] = 'application/json'
-            return response
-        
-        return app
+            return jsonify(test_data)
     
     def get_agent_card(self):
         """Return the agent card for discovery."""
@@ -201,16 +131,15 @@ class WeatherAgent(A2AServer):
             logger.warning(f"Could not load agent config: {e}, using defaults.")
             agent_config = None
             
-        # CRITICAL FIX: Separate URLs for discovery and A2A communication
-        flask_url = f"http://127.0.0.1:{self.flask_port}" if self.flask_port else "http://127.0.0.1:5211"
-        a2a_url = f"http://127.0.0.1:{self.a2a_port}" if self.a2a_port else "http://127.0.0.1:5212"
+        # Discovery and A2A tasks share the same port
+        base_url = f"http://127.0.0.1:{self.port}" if self.port else "http://127.0.0.1:5211"
         
         return {
             "id": "weather_agent_001",
             "name": "Weather Agent",
             "description": "Provides current weather conditions and forecasts for any location worldwide",
-            "url": flask_url,  # Discovery service URL
-            "a2a_endpoint": f"{a2a_url}/a2a",  # A2A server URL (separate port!)
+            "url": base_url,
+            "a2a_endpoint": f"{base_url}/a2a",
             "version": "1.0.0",
             "type": "agent",
             "protocol": "a2a",
@@ -219,12 +148,12 @@ class WeatherAgent(A2AServer):
                 "pushNotifications": False
             },
             "endpoints": {
-                "discovery": f"{flask_url}/.well-known/agent.json",
-                "a2a": f"{a2a_url}/a2a",
-                "task": f"{a2a_url}/task", 
-                "status": f"{a2a_url}/status",
-                "health": f"{flask_url}/health",
-                "test": f"{flask_url}/test"
+                "discovery": f"{base_url}/.well-known/agent.json",
+                "a2a": f"{base_url}/a2a",
+                "task": f"{base_url}/tasks/send",
+                "status": f"{base_url}/tasks/get",
+                "health": f"{base_url}/health",
+                "test": f"{base_url}/test"
             },
             "skills": [
                 {
@@ -300,7 +229,8 @@ class WeatherAgent(A2AServer):
             content = message_data.get("content", {})
             text = content.get("text", "") if isinstance(content, dict) else ""
             
-            logger.info(f"WeatherAgent received task with text: {text}")
+            # Formatted by loguru only if DEBUG is enabled
+            logger.debug("WeatherAgent received task with text: {}", text)
             
             if not text:
                 task.status = TaskStatus(
@@ -316,7 +246,8 @@ class WeatherAgent(A2AServer):
                 return task
             
             # Parse the request
-            location = self._extract_location_from_text(text.lower())
+            text_lower = text.lower()
+            location = self._extract_location_from_text(text_lower)
             if not location:
                 task.status = TaskStatus(
                     state=TaskState.INPUT_REQUIRED,
@@ -331,13 +262,14 @@ class WeatherAgent(A2AServer):
                 return task
             
             # Determine if it's a forecast or current weather request
-            is_forecast = any(word in text.lower() for word in ["forecast", "tomorrow", "next", "future", "upcoming", "week", "days"])
+            is_forecast = _FORECAST_RE.search(text_lower) is not None
             
             if is_forecast:
-                days = self._extract_days_from_text(text.lower())
-                weather_response = asyncio.run(self.get_weather_forecast(location, days))
+                days = self._extract_days_from_text(text_lower)
+                coro = self.get_weather_forecast(location, days)
             else:
-                weather_response = asyncio.run(self.get_current_weather(location))
+                coro = self.get_current_weather(location)
+            weather_response = asyncio.run_coroutine_threadsafe(coro, _task_loop).result(timeout=15)
             
             # Create successful response
             task.artifacts = [{
@@ -361,20 +293,13 @@ class WeatherAgent(A2AServer):
         return task
 
     def _extract_location_from_text(self, text: str) -> Optional[str]:
-        """Extract location from natural language text."""
-        # Common patterns for location extraction
-        patterns = [
-            r'(?:weather|forecast|conditions)\s+(?:in|for|at)\s+([a-zA-Z\s,]+?)(?:\s|$|\?|!|\.|,)',
-            r'(?:in|for|at)\s+([a-zA-Z\s,]+?)(?:\s|$|\?|!|\.|weather|forecast)',
-            r'([A-Z][a-zA-Z\s,]+?)(?:\s+weather|\s+forecast|\?|$)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        """Extract location from natural language text (expects already-lowercased text)."""
+        for pattern in _LOCATION_PATTERNS:
+            match = pattern.search(text)
             if match:
                 location = match.group(1).strip().rstrip(',')
                 # Clean up common words that might be captured
-                location = re.sub(r'\b(weather|forecast|conditions|current|today|tomorrow)\b', '', location, flags=re.IGNORECASE).strip()
+                location = _LOCATION_CLEAN_RE.sub('', location).strip()
                 if location and len(location) > 1:
                     return location
         
@@ -382,7 +307,7 @@ class WeatherAgent(A2AServer):
         words = text.split()
         capitalized_words = []
         for word in words:
-            clean_word = re.sub(r'[^\w\s]', '', word)
+            clean_word = _PUNCTUATION_RE.sub('', word)
             if clean_word and clean_word[0].isupper() and clean_word.isalpha():
                 capitalized_words.append(clean_word)
         
@@ -392,19 +317,9 @@ class WeatherAgent(A2AServer):
         return None
 
     def _extract_days_from_text(self, text: str) -> int:
-        """Extract number of days from text query."""
-        # Look for specific day numbers
-        day_patterns = [
-            (r'(\d+)\s*(?:day|days)', lambda m: int(m.group(1))),
-            (r'(one|two|three|four|five|six|seven|eight|nine|ten)\s*(?:day|days)', 
-             lambda m: {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 
-                       'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}.get(m.group(1), 3)),
-            (r'week', lambda m: 7),
-            (r'tomorrow', lambda m: 1),
-        ]
-        
-        for pattern, converter in day_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        """Extract number of days from text query (expects already-lowercased text)."""
+        for pattern, converter in _DAY_PATTERNS:
+            match = pattern.search(text)
             if match:
                 try:
                     days = converter(match)
@@ -433,14 +348,16 @@ class WeatherAgent(A2AServer):
         feels_like = current.get("feelslike_c")
 
         if temp_c is not None and condition:
-            response = f"🌤️ Current weather in {display_location}:\n\n"
-            response += f"• Condition: {condition}\n"
-            response += f"• Temperature: {temp_c}°C"
+            temperature = f"• Temperature: {temp_c}°C"
             if feels_like and abs(feels_like - temp_c) > 1:
-                response += f" (feels like {feels_like}°C)"
-            response += f"\n• Wind: {wind_kph} km/h\n"
-            response += f"• Humidity: {humidity}%"
-            return response
+                temperature = f"{temperature} (feels like {feels_like}°C)"
+            return "\n".join((
+                f"🌤️ Current weather in {display_location}:\n",
+                f"• Condition: {condition}",
+                temperature,
+                f"• Wind: {wind_kph} km/h",
+                f"• Humidity: {humidity}%",
+            ))
         
         return f"Could not get detailed weather information for {location}. Please try again."
 
@@ -467,18 +384,20 @@ class WeatherAgent(A2AServer):
             chance_of_rain = day_info.get("daily_chance_of_rain", 0)
             
             day_label = "Today" if i == 0 else "Tomorrow" if i == 1 else date
-            response_lines.append(f"🗓️ **{day_label}** ({date}):")
-            response_lines.append(f"   • {condition}")
-            response_lines.append(f"   • High: {max_temp_c}°C, Low: {min_temp_c}°C")
-            if chance_of_rain > 0:
-                response_lines.append(f"   • Chance of rain: {chance_of_rain}%")
-            response_lines.append("")
+            rain = f"   • Chance of rain: {chance_of_rain}%\n" if chance_of_rain > 0 else ""
+            # One entry per day; the trailing newline leaves a blank line between days
+            response_lines.append(
+                f"🗓️ **{day_label}** ({date}):\n"
+                f"   • {condition}\n"
+                f"   • High: {max_temp_c}°C, Low: {min_temp_c}°C\n"
+                f"{rain}"
+            )
         
         return "\n".join(response_lines)
 
 
 async def start_weather_agent():
-    """Start the weather agent with proper port separation for discovery and A2A services."""
+    """Start the weather agent, serving discovery and A2A tasks from one server."""
     try:
         agent_config = settings.load_agent_config("weather_agent")
         if not agent_config:
@@ -486,70 +405,37 @@ async def start_weather_agent():
     except Exception as e:
         logger.warning(f"Could not load agent config: {e}, using defaults.")
 
-    # CRITICAL FIX: Use separate ports for Flask discovery and A2A server
     try:
         base_port = settings.get_agent_port("weather_agent") or 5211
     except Exception as e:
         logger.warning(f"Could not get agent port: {e}, using default 5211")
         base_port = 5211
     
-    # Find available ports - Flask discovery first, then A2A server
-    flask_port = find_free_port(base_port)
-    a2a_port = find_free_port(flask_port + 1)  # Start looking after flask_port
+    port = find_free_port(base_port)
     
     agent = WeatherAgent()
-    agent.flask_port = flask_port
-    agent.a2a_port = a2a_port
+    agent.port = port
     
-    logger.info(f"🌤️ Weather Agent configuration:")
-    logger.info(f"  📍 Flask Discovery Port: {flask_port}")
-    logger.info(f"  🤖 A2A Server Port: {a2a_port}")
-    logger.info(f"  🔍 Discovery URL: http://127.0.0.1:{flask_port}/.well-known/agent.json")
-    logger.info(f"  💬 A2A URL: http://127.0.0.1:{a2a_port}/a2a")
+    logger.info("\n".join((
+        "🌤️ Weather Agent configuration:",
+        f"  📍 Port: {port}",
+        f"  🔍 Discovery URL: http://127.0.0.1:{port}/.well-known/agent.json",
+        f"  💬 A2A URL: http://127.0.0.1:{port}/a2a",
+    )))
     
-    # Create and start Flask app for discovery
-    flask_app = agent.create_flask_app()
-    
-    def run_flask():
-        try:
-            logger.info(f"🚀 Starting Flask discovery server on port {flask_port}")
-            flask_app.run(
-                host='127.0.0.1', 
-                port=flask_port, 
-                debug=False, 
-                use_reloader=False,
-                threaded=True
-            )
-        except Exception as e:
-            logger.error(f"❌ Flask server error: {e}")
-    
-    # Start Flask in background thread
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start()
-    
-    # Give Flask time to start and verify it's accessible
-    await asyncio.sleep(2)
+    # Werkzeug writes an access-log line to stderr for every request; keep only errors
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
     
     try:
-        # Test the discovery endpoint
-        discovery_url = f"http://127.0.0.1:{flask_port}/.well-known/agent.json"
-        response = requests.get(discovery_url, timeout=5)
-        if response.status_code == 200:
-            logger.info(f"✅ Flask discovery server is running and accessible")
-            logger.info(f"✅ Agent card discoverable at: {discovery_url}")
-        else:
-            logger.warning(f"⚠️ Discovery endpoint returned status {response.status_code}")
-    except Exception as e:
-        logger.error(f"❌ Could not verify Flask discovery server: {e}")
-        logger.info("🔄 Continuing anyway - Flask might still be starting up...")
-    
-    # Start A2A server on separate port
-    try:
-        logger.info(f"🚀 Starting A2A server on port {a2a_port}...")
-        logger.info("=" * 50)
-        await run_server(agent, host="127.0.0.1", port=a2a_port)
+        logger.info(f"🚀 Starting A2A server on port {port}...\n{'=' * 50}")
+        # run_server blocks in python_a2a's Flask server until shutdown
+        run_server(agent, host="127.0.0.1", port=port)
     except Exception as e:
         logger.error(f"❌ Error starting A2A server: {e}")
+    finally:
+        await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(WeatherClient.aclose(), _task_loop)
+        )
 
 
 def main():
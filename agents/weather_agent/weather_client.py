@@ -1,29 +1,88 @@
 # multi_agent_system/agents/weather_agent/weather_client.py
 
-from typing import Dict, Any, Optional
+import asyncio
+import httpx
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from loguru import logger
-from protocols.communication import AsyncCommManager # Assuming comm_manager is passed or imported
+from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+
+CURRENT_TTL = 120  # seconds; current conditions change slowly
+FORECAST_TTL = 600
+CACHE_MAX_ENTRIES = 256
+
+# One keep-alive client per process, shared by every WeatherClient instance
+_shared_client: Optional[httpx.AsyncClient] = None
+_shared_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive client, creating it on first use in the running loop."""
+    global _shared_client, _shared_client_loop
+    loop = asyncio.get_running_loop()
+    if _shared_client is None or _shared_client.is_closed or _shared_client_loop is not loop:
+        _shared_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20),
+            timeout=10.0
+        )
+        _shared_client_loop = loop
+    return _shared_client
+
 
 class WeatherClient:
-    def __init__(self, api_key: str, base_url: str, comm_manager: AsyncCommManager):
+    def __init__(self, api_key: str, base_url: str):
         self.api_key = api_key
         self.base_url = base_url
-        self.comm_manager = comm_manager
+        self._cache: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
         logger.info(f"WeatherClient initialized with base URL: {base_url}")
 
+    def _cache_get(self, key: Tuple, ttl: float) -> Optional[Dict[str, Any]]:
+        """Return a cached response if it is younger than ttl seconds."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, data = entry
+        if time.monotonic() - stored_at >= ttl:
+            self._cache.pop(key, None)
+            return None
+        self._cache.move_to_end(key)
+        return data
+
+    def _cache_put(self, key: Tuple, data: Dict[str, Any]) -> None:
+        """Store a response, evicting the least recently used entry when full."""
+        self._cache[key] = (time.monotonic(), data)
+        self._cache.move_to_end(key)
+        if len(self._cache) > CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2), retry=retry_if_exception_type(httpx.NetworkError))
+    async def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Performs a GET against the weather API over the pooled connection."""
+        response = await _get_client().get(f"{self.base_url}{path}", params=params)
+        response.raise_for_status()
+        return response.json()
+
     async def get_current_weather(self, location: str) -> Optional[Dict[str, Any]]:
         """
         Fetches current weather data for a given location.
         Uses WeatherAPI.com (free tier) as an example.
         """
-        endpoint = f"{self.base_url}/current.json"
+        key = ("current", location.strip().lower())
+        cached = self._cache_get(key, CURRENT_TTL)
+        if cached is not None:
+            return cached
+
         params = {
             "key": self.api_key,
             "q": location
         }
         try:
-            data = await self.comm_manager.get(endpoint, params=params)
-            logger.debug(f"WeatherAPI current weather response for {location}: {data}")
+            data = await self._get("/current.json", params)
+            logger.debug("WeatherAPI current weather response for {}: {}", location, data)
+            if data:
+                self._cache_put(key, data)
             return data
         except Exception as e:
             logger.error(f"Failed to fetch current weather for {location}: {e}")
@@ -32,22 +91,35 @@ class WeatherClient:
     async def get_weather_forecast(self, location: str, days: int = 3) -> Optional[Dict[str, Any]]:
         """
         Fetches weather forecast data for a given location and number of days.
-        Uses WeatherAPI.com (free tier) as an example.
+        Uses WeatherAPI.com (free tier) as an example. days is clamped to 1-10.
         """
-        if not (1 <= days <= 10): # Free tier limit is often 10 days
-            logger.warning(f"Forecast days ({days}) out of supported range (1-10). Defaulting to 3.")
-            days = 3
+        days = max(1, min(days, 10))  # Free tier limit is often 10 days
+
+        key = ("forecast", location.strip().lower(), days)
+        cached = self._cache_get(key, FORECAST_TTL)
+        if cached is not None:
+            return cached
 
-        endpoint = f"{self.base_url}/forecast.json"
         params = {
             "key": self.api_key,
             "q": location,
             "days": days
         }
         try:
-            data = await self.comm_manager.get(endpoint, params=params)
-            logger.debug(f"WeatherAPI forecast response for {location} ({days} days): {data}")
+            data = await self._get("/forecast.json", params)
+            logger.debug("WeatherAPI forecast response for {} ({} days): {}", location, days, data)
+            if data:
+                self._cache_put(key, data)
             return data
         except Exception as e:
             logger.error(f"Failed to fetch weather forecast for {location} ({days} days): {e}")
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    async def aclose():
+        """Close the HTTP client shared by all WeatherClient instances."""
+        global _shared_client, _shared_client_loop
+        if _shared_client is not None and not _shared_client.is_closed:
+            await _shared_client.aclose()
+        _shared_client = None
+        _shared_client_loop = None
@@ -1,9 +1,10 @@
-# agents/web_search_agent/web_search_agent.py - FIXED version with proper JSON responses
-from python_a2a import A2AServer, skill, agent, run_server, TaskStatus, TaskState
-from flask import Flask, jsonify, request
+# agents/web_search_agent/web_search_agent.py - discovery endpoints served by the A2A server itself
+from python_a2a import A2AServer, skill, agent, TaskStatus, TaskState
+from flask import Response
 from loguru import logger
 import asyncio
-import json
+import logging
+import orjson
 import re
 from typing import Dict, Any, Optional
 import threading
@@ -11,20 +12,49 @@ import time
 import socket
 
 from agents.web_search_agent.search_client import DuckDuckGoSearchClient
+from agents.a2a_http import bind_discovery_views, serve_agent
 from config.settings import settings
 from protocols.communication import comm_manager
 
 
+# Persistent event loop for running skill coroutines from the synchronous
+# handle_task, so the httpx client and connection pool survive across tasks.
+_task_loop = asyncio.new_event_loop()
+threading.Thread(target=_task_loop.run_forever, name="web-search-agent-loop", daemon=True).start()
+
+
 def find_free_port(start_port: int = 5512) -> int:
-    """Find a free port starting from the given port number."""
-    for port in range(start_port, start_port + 100):
+    """Return start_port if it is free, otherwise a port assigned by the kernel."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(('127.0.0.1', port))
-                return port
+            s.bind(('127.0.0.1', start_port))
         except OSError:
-            continue
-    raise RuntimeError(f"Could not find free port starting from {start_port}")
+            s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# Intent extraction tables, compiled once at import instead of per task
+_QUERY_PATTERNS = [
+    re.compile(r'(?:search|find|look up|lookup)\s+(?:for|about|on)?\s*["\']?([^"\']+?)["\']?(?:\s|$|\?|!|\.|,)', re.IGNORECASE),
+    re.compile(r'(?:search|find|look up|lookup)\s+(?:for|about|on)?\s*(.+)', re.IGNORECASE),
+    re.compile(r'(?:what|how|where|when|why)\s+(.+)', re.IGNORECASE),
+]
+_STRIP_WORDS_RE = re.compile(r'\b(search|find|look up|lookup|for|about|on|news|headlines)\b', re.IGNORECASE)
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_NEWS_RE = re.compile(r'news|headlines|breaking|recent|latest|current events')
+
+_WORD_NUM = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+             'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+_DIGIT_RE = re.compile(r'\d')
+_WORD_NUM_RE = re.compile('|'.join(_WORD_NUM), re.IGNORECASE)
+_RESULT_PATTERNS = [
+    (re.compile(r'(\d+)\s*(?:results|entries|items|links)', re.IGNORECASE), lambda m: int(m.group(1))),
+    (re.compile(r'(?:show|get|find)\s+(\d+)', re.IGNORECASE), lambda m: int(m.group(1))),
+    (re.compile(r'top\s+(\d+)', re.IGNORECASE), lambda m: int(m.group(1))),
+    (re.compile(r'first\s+(\d+)', re.IGNORECASE), lambda m: int(m.group(1))),
+    (re.compile(r'(one|two|three|four|five|six|seven|eight|nine|ten)\s*(?:results|entries|items|links)', re.IGNORECASE),
+     lambda m: _WORD_NUM.get(m.group(1), 5)),
+]
 
 
 @agent(
@@ -38,164 +68,76 @@ class WebSearchAgent(A2AServer):
         """Initialize the web search agent with search client."""
         super().__init__()
         self.search_client = DuckDuckGoSearchClient(comm_manager)
-        self.flask_app = None
-        self.flask_port = None
-        self.a2a_port = None
-        self.flask_thread = None
+        self.port = None
+        self._agent_card = None
+        self._agent_card_bytes = None
         logger.info("WebSearchAgent initialized with decorator-based A2A protocol.")
     
-    def create_flask_app(self):
-        """Create Flask app for A2A discovery with STRICT JSON responses."""
-        app = Flask(__name__)
-        
-        # CRITICAL: Disable all template rendering and HTML responses
-        app.config['TEMPLATES_AUTO_RELOAD'] = False
-        app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
-        app.config['JSON_SORT_KEYS'] = False
-        
-        # Get agent card data
-        agent_card = self.get_agent_card()
-        
-        # CRITICAL FIX: Force JSON response helper
-        def force_json_response(data, status_code=200):
-            """Force a JSON response with proper headers."""
-            response = jsonify(data)
-            response.headers['Content-Type'] = 'application/json'
-            response.headers['Cache-Control'] = 'no-cache'
-            response.status_code = status_code
-            return response
-        
-        @app.route('/', methods=['GET'])
-        def index():
-            """Root endpoint returns agent card."""
-            logger.debug("Flask: Root endpoint accessed")
-            return force_json_response(agent_card)
-        
-        @app.route('/.well-known/agent.json', methods=['GET'])
-        def well_known_agent():
-            """Standard A2A discovery endpoint - CRITICAL FOR DISCOVERY!"""
-            logger.info("Flask: A2A discovery endpoint accessed")
-            return force_json_response(agent_card)
-        
-        @app.route('/a2a', methods=['GET'])
-        def a2a_endpoint():
-            """A2A protocol endpoint for discovery."""
-            logger.debug("Flask: A2A endpoint accessed")
-            return force_json_response(agent_card)
-        
-        @app.route('/agent-card', methods=['GET'])
-        def agent_card_endpoint():
-            """Agent card endpoint."""
-            logger.debug("Flask: Agent card endpoint accessed")
-            return force_json_response(agent_card)
-        
-        @app.route('/info', methods=['GET'])
-        def info():
-            """Info endpoint."""
-            logger.debug("Flask: Info endpoint accessed")
-            return force_json_response(agent_card)
+    def setup_routes(self, app):
+        """Register the A2A routes plus discovery aliases on the A2A server's Flask app."""
+        super().setup_routes(app)
+        
+        # The port is fixed by now, so build and serialize the agent card once
+        self._agent_card = agent_card = self.get_agent_card()
+        self._agent_card_bytes = card_bytes = orjson.dumps(agent_card)
+        
+        cors_headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+        }
+        card_headers = {**cors_headers, 'Cache-Control': 'public, max-age=60'}
+        json_headers = {**cors_headers, 'Cache-Control': 'no-cache'}
+        
+        def card_response():
+            """Return the pre-serialized agent card."""
+            return Response(card_bytes, status=200, mimetype='application/json',
+                            headers=card_headers)
+        
+        def json_response(data, status_code=200):
+            """Serialize data with orjson into a JSON response."""
+            return Response(orjson.dumps(data), status=status_code, mimetype='application/json',
+                            headers=json_headers)
+        
+        # python_a2a already binds GET "/", "/a2a" and "/.well-known/agent.json" to its
+        # generic UI/card views; serve our cached card on all of them instead.
+        bind_discovery_views(app, card_response)
+        
+        # The other card aliases dispatch straight to the same view
+        app.add_url_rule('/agent-card', 'agent_card_endpoint', card_response, methods=['GET'])
+        app.add_url_rule('/info', 'info', card_response, methods=['GET'])
         
         @app.route('/health', methods=['GET'])
         def health():
             """Health check endpoint."""
-            logger.debug("Flask: Health endpoint accessed")
             health_data = {
                 "status": "healthy",
                 "agent": "Web Search Agent",
                 "version": "1.0.0",
-                "timestamp": time.time(),
-                "ports": {
-                    "flask": self.flask_port,
-                    "a2a": self.a2a_port
-                },
-                "services": {
-                    "flask_discovery": f"http://127.0.0.1:{self.flask_port}",
-                    "a2a_server": f"http://127.0.0.1:{self.a2a_port}/a2a"
-                }
+                "port": self.port,
+                "timestamp": time.time()
             }
-            return force_json_response(health_data)
+            return json_response(health_data)
         
         @app.route('/test', methods=['GET'])
         def test_endpoint():
             """Test endpoint for diagnostics."""
-            logger.debug("Flask: Test endpoint accessed")
             test_data = {
-                "message": "Web Search Agent Flask discovery server is running",
+                "message": "Web Search Agent is running",
                 "agent": agent_card,
                 "test_time": time.time(),
-                "discovery_working": True
-            }
-            return force_json_response(test_data)
-        
-        # CRITICAL: Error handlers must return JSON, not HTML
-        @app.errorhandler(404)
-        def not_found(error):
-            logger.warning(f"Flask: 404 error for path: {request.path}")
-            error_data = {
-                "error": "Not Found",
-                "message": f"The requested endpoint '{request.path}' was not found",
-                "available_endpoints": [
-                    "/", "/.well-known/agent.json", "/a2a", 
-                    "/agent-card", "/info", "/health", "/test"
-                ]
+                "port": self.port
             }
-            return force_json_response(error_data, 404)
-        
-        @app.errorhandler(500)
-        def internal_error(error):
-            logger.error(f"Flask: 500 error: {error}")
-            error_data = {
-                "error": "Internal Server Error",
-                "message": "An internal error occurred"
-            }
-            return force_json_response(error_data, 500)
-        
-        @app.errorhandler(Exception)
-        def handle_exception(e):
-            """Handle all other exceptions with JSON response."""
-            logger.error(f"Flask error: {e}", exc_info=True)
-            error_data = {
-                "error": "Server Error",
-                "message": str(e)
-            }
-            return force_json_response(error_data, 500)
-        
-        # CORS and headers
-        @app.before_request
-        def before_request():
-            """Set JSON content type for all requests."""
-            if request.method == 'GET':
-                # Force JSON response preparation
-                pass
-        
-        @app.after_request
-        def after_request(response):
-            """Ensure all responses are JSON with proper headers."""
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            
-            # CRITICAL: Force JSON content type
-            if not response.headers.get('Content-Type'):
-                response.headers['Content-Type'] = 'application/json'
-            elif 'text/html' in response.headers.get('Content-Type', ''):
-                # Fix any HTML responses to JSON
-                logger.warning("Detected HTML response, forcing JSON content type")
-                response.headers['Content-Type'] = 'application/json'
-            
-            return response
-        
-        return app
+            return json_response(test_data)
     
     def get_agent_card(self):
         """Return the agent card for discovery."""
         try:
             agent_config = settings.load_agent_config("web_search_agent")
-            base_port = self.flask_port or 5512
             
-            # Use the Flask port for discovery URL
-            base_url = f"http://127.0.0.1:{base_port}"
-            a2a_url = f"http://127.0.0.1:{self.a2a_port}/a2a" if self.a2a_port else f"{base_url}/a2a"
+            # Discovery and A2A tasks share the same port
+            base_url = f"http://127.0.0.1:{self.port or 5512}"
+            a2a_url = f"{base_url}/a2a"
             
             return {
                 "id": "web_search_agent_001",
@@ -264,8 +206,8 @@ class WebSearchAgent(A2AServer):
                 "id": "web_search_agent_001",
                 "name": "Web Search Agent",
                 "description": "Performs web searches using DuckDuckGo and returns relevant results",
-                "url": f"http://127.0.0.1:{self.flask_port or 5512}",
-                "a2a_endpoint": f"http://127.0.0.1:{self.a2a_port or 5513}",
+                "url": f"http://127.0.0.1:{self.port or 5512}",
+                "a2a_endpoint": f"http://127.0.0.1:{self.port or 5512}/a2a",
                 "version": "1.0.0",
                 "type": "agent",
                 "protocol": "a2a",
@@ -281,11 +223,11 @@ class WebSearchAgent(A2AServer):
     async def search_web(self, query: str, max_results: int = 5) -> str:
         """Search the web for a query."""
         try:
-            logger.info(f"Searching web for: {query}")
-            search_data = await self.search_client.search_web(query)
+            logger.info("Searching web for: {}", query)
+            search_data = await self.search_client.search_web(query, limit=max_results)
             return self._format_search_response(query, search_data, max_results)
         except Exception as e:
-            logger.error(f"Error searching web for {query}: {e}")
+            logger.error("Error searching web for {}: {}", query, e)
             return f"Sorry, I couldn't search for '{query}'. Please try again."
     
     @skill(
@@ -296,12 +238,12 @@ class WebSearchAgent(A2AServer):
     async def search_news(self, query: str, max_results: int = 5) -> str:
         """Search for news articles related to a query."""
         try:
-            logger.info(f"Searching news for: {query}")
+            logger.info("Searching news for: {}", query)
             news_query = f"{query} news"
-            search_data = await self.search_client.search_web(news_query)
+            search_data = await self.search_client.search_web(news_query, limit=max_results)
             return self._format_news_response(query, search_data, max_results)
         except Exception as e:
-            logger.error(f"Error searching news for {query}: {e}")
+            logger.error("Error searching news for {}: {}", query, e)
             return f"Sorry, I couldn't search for news about '{query}'. Please try again."
 
     def handle_task(self, task):
@@ -312,7 +254,7 @@ class WebSearchAgent(A2AServer):
             content = message_data.get("content", {})
             text = content.get("text", "") if isinstance(content, dict) else ""
             
-            logger.info(f"WebSearchAgent received task with text: {text}")
+            logger.debug("WebSearchAgent received task with text: {}", text)
             
             if not text:
                 task.status = TaskStatus(
@@ -328,7 +270,8 @@ class WebSearchAgent(A2AServer):
                 return task
             
             # Parse the request
-            query = self._extract_query_from_text(text.lower())
+            lowered = text.lower()
+            query = self._extract_query_from_text(lowered)
             if not query:
                 task.status = TaskStatus(
                     state=TaskState.INPUT_REQUIRED,
@@ -343,14 +286,15 @@ class WebSearchAgent(A2AServer):
                 return task
             
             # Determine if it's a news search or general web search
-            is_news = any(word in text.lower() for word in ["news", "headlines", "breaking", "recent", "latest", "current events"])
+            is_news = _NEWS_RE.search(lowered) is not None
             
-            max_results = self._extract_max_results_from_text(text.lower())
+            max_results = self._extract_max_results_from_text(lowered)
             
             if is_news:
-                search_response = asyncio.run(self.search_news(query, max_results))
+                coro = self.search_news(query, max_results)
             else:
-                search_response = asyncio.run(self.search_web(query, max_results))
+                coro = self.search_web(query, max_results)
+            search_response = asyncio.run_coroutine_threadsafe(coro, _task_loop).result(timeout=15)
             
             # Create successful response
             task.artifacts = [{
@@ -375,19 +319,12 @@ class WebSearchAgent(A2AServer):
 
     def _extract_query_from_text(self, text: str) -> Optional[str]:
         """Extract search query from natural language text."""
-        # Common patterns for query extraction
-        patterns = [
-            r'(?:search|find|look up|lookup)\s+(?:for|about|on)?\s*["\']?([^"\']+?)["\']?(?:\s|$|\?|!|\.|,)',
-            r'(?:search|find|look up|lookup)\s+(?:for|about|on)?\s*(.+)',
-            r'(?:what|how|where|when|why)\s+(.+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _QUERY_PATTERNS:
+            match = pattern.search(text)
             if match:
                 query = match.group(1).strip().rstrip(',')
                 # Clean up common words that might be captured
-                query = re.sub(r'\b(search|find|look up|lookup|for|about|on|news|headlines)\b', '', query, flags=re.IGNORECASE).strip()
+                query = _STRIP_WORDS_RE.sub('', query).strip()
                 if query and len(query) > 1:
                     return query
         
@@ -396,8 +333,8 @@ class WebSearchAgent(A2AServer):
         meaningful_words = []
         skip_next = False
         
-        for i, word in enumerate(words):
-            clean_word = re.sub(r'[^\w\s]', '', word)
+        for word in words:
+            clean_word = _PUNCT_RE.sub('', word)
             if skip_next:
                 skip_next = False
                 continue
@@ -414,19 +351,12 @@ class WebSearchAgent(A2AServer):
 
     def _extract_max_results_from_text(self, text: str) -> int:
         """Extract maximum number of results from text query."""
-        # Look for specific result numbers
-        result_patterns = [
-            (r'(\d+)\s*(?:results|entries|items|links)', lambda m: int(m.group(1))),
-            (r'(?:show|get|find)\s+(\d+)', lambda m: int(m.group(1))),
-            (r'top\s+(\d+)', lambda m: int(m.group(1))),
-            (r'first\s+(\d+)', lambda m: int(m.group(1))),
-            (r'(one|two|three|four|five|six|seven|eight|nine|ten)\s*(?:results|entries|items|links)', 
-             lambda m: {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 
-                       'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}.get(m.group(1), 5)),
-        ]
+        # Every pattern needs a digit or a number word; most queries have neither
+        if not _DIGIT_RE.search(text) and not _WORD_NUM_RE.search(text):
+            return 5
         
-        for pattern, converter in result_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern, converter in _RESULT_PATTERNS:
+            match = pattern.search(text)
             if match:
                 try:
                     results = converter(match)
@@ -445,20 +375,21 @@ class WebSearchAgent(A2AServer):
         if not results:
             return f"🔍 No search results found for '{query}'. Please try a different search term."
         
-        response = f"🔍 Top {min(max_results, len(results))} search results for **{query}**:\n\n"
+        results = results[:max_results]
+        parts = [f"🔍 Top {len(results)} search results for **{query}**:\n\n"]
         
-        for i, result in enumerate(results[:max_results]):
+        for result in results:
             title = result.get("title", "No Title")
             url = result.get("url", "#")
             snippet = result.get("body", "")
             
-            response += f"🔸 **{title}**\n"
+            parts.append(f"🔸 **{title}**\n")
             if snippet and len(snippet) > 10:
                 snippet_preview = snippet[:200] + "..." if len(snippet) > 200 else snippet
-                response += f"   📝 {snippet_preview}\n"
-            response += f"   🔗 {url}\n\n"
+                parts.append(f"   📝 {snippet_preview}\n")
+            parts.append(f"   🔗 {url}\n\n")
         
-        return response
+        return "".join(parts)
 
     def _format_news_response(self, query: str, data: Dict[str, Any], max_results: int) -> str:
         """Format news search results into a readable response."""
@@ -469,66 +400,25 @@ class WebSearchAgent(A2AServer):
         if not results:
             return f"📰 No news results found for '{query}'. Please try a different search term."
 
-        response = f"📰 Latest news about **{query}** ({min(max_results, len(results))} articles):\n\n"
+        results = results[:max_results]
+        parts = [f"📰 Latest news about **{query}** ({len(results)} articles):\n\n"]
 
-        for i, result in enumerate(results[:max_results]):
+        for result in results:
             title = result.get("title", "No Title")
             url = result.get("url", "#")
             snippet = result.get("body", "")
             
-            response += f"📄 **{title}**\n"
+            parts.append(f"📄 **{title}**\n")
             if snippet and len(snippet) > 10:
                 snippet_preview = snippet[:250] + "..." if len(snippet) > 250 else snippet
-                response += f"   📋 {snippet_preview}\n"
-            response += f"   🔗 {url}\n\n"
+                parts.append(f"   📋 {snippet_preview}\n")
+            parts.append(f"   🔗 {url}\n\n")
         
-        return response
-
-    async def start_flask_server(self):
-        """Start the Flask discovery server in a separate thread."""
-        def run_flask():
-            try:
-                logger.info(f"🌐 Starting Flask discovery server on http://127.0.0.1:{self.flask_port}")
-                # CRITICAL: Disable Flask's development features that might cause HTML responses
-                self.flask_app.run(
-                    host='127.0.0.1', 
-                    port=self.flask_port, 
-                    debug=False,  # CRITICAL: Must be False
-                    use_reloader=False,  # CRITICAL: Must be False
-                    threaded=True
-                )
-            except Exception as e:
-                logger.error(f"Flask server error: {e}")
-        
-        # Start Flask in background thread
-        self.flask_thread = threading.Thread(target=run_flask, daemon=True)
-        self.flask_thread.start()
-        
-        # Give Flask time to start and verify it's running
-        await asyncio.sleep(3)
-        
-        # Test the discovery endpoint
-        try:
-            import httpx
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"http://127.0.0.1:{self.flask_port}/.well-known/agent.json")
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        logger.info(f"✅ Flask discovery server is running and returning valid JSON")
-                        logger.info(f"✅ Agent card discoverable at: http://127.0.0.1:{self.flask_port}/.well-known/agent.json")
-                        logger.info(f"📝 Agent name: {data.get('name', 'Unknown')}")
-                    except json.JSONDecodeError:
-                        logger.error(f"❌ Flask server is returning HTML instead of JSON!")
-                        logger.error(f"Response content: {response.text[:200]}...")
-                else:
-                    logger.warning(f"Flask server responded with status {response.status_code}")
-        except Exception as e:
-            logger.error(f"Failed to verify Flask server: {e}")
+        return "".join(parts)
 
 
 async def start_web_search_agent():
-    """Start the web search agent with proper port separation for discovery."""
+    """Start the web search agent, serving discovery and A2A tasks from one server."""
     try:
         agent_config = settings.load_agent_config("web_search_agent")
         if not agent_config:
@@ -536,40 +426,35 @@ async def start_web_search_agent():
     except Exception as e:
         logger.warning(f"Could not load agent config: {e}, using defaults.")
 
-    # Use separate ports for Flask discovery and A2A server
     base_port = 5512
     try:
         base_port = settings.get_agent_port("web_search_agent") or 5512
     except Exception as e:
         logger.warning(f"Could not get agent port: {e}, using default 5512")
     
-    # Use separate ports - Flask for discovery, A2A for task processing
-    flask_port = find_free_port(base_port)  # Discovery server port
-    a2a_port = find_free_port(flask_port + 1)  # A2A server port (different port)
+    port = find_free_port(base_port)
     
     agent = WebSearchAgent()
-    agent.flask_port = flask_port
-    agent.a2a_port = a2a_port
+    agent.port = port
     
     logger.info(f"🔍 Web Search Agent configuration:")
-    logger.info(f"  Flask Discovery Port: {flask_port}")
-    logger.info(f"  A2A Server Port: {a2a_port}")
-    logger.info(f"  Discovery URL: http://127.0.0.1:{flask_port}/.well-known/agent.json")
-    logger.info(f"  A2A URL: http://127.0.0.1:{a2a_port}/a2a")
-    
-    # Create Flask app for discovery
-    agent.flask_app = agent.create_flask_app()
+    logger.info(f"  Port: {port}")
+    logger.info(f"  Discovery URL: http://127.0.0.1:{port}/.well-known/agent.json")
+    logger.info(f"  A2A URL: http://127.0.0.1:{port}/a2a")
     
-    # Start Flask discovery server
-    await agent.start_flask_server()
+    # The Werkzeug fallback writes an access-log line to stderr for every request; keep only errors
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
     
-    # Start A2A server on different port
     try:
-        logger.info(f"🚀 Starting A2A server on port {a2a_port}...")
-        await run_server(agent, host="127.0.0.1", port=a2a_port)
+        logger.info(f"🚀 Starting A2A server on port {port}...")
+        # serve_agent blocks in waitress (or the Flask dev server without it) until shutdown
+        serve_agent(agent, host="127.0.0.1", port=port)
     except Exception as e:
         logger.error(f"❌ Error starting A2A server: {e}")
-        raise
+    finally:
+        await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(agent.search_client.aclose(), _task_loop)
+        )
 
 
 def main():
@@ -1,69 +1,128 @@
 # multi_agent_system/agents/web_search_agent/duckduckgo_search_client.py
 
+import asyncio
 import httpx
+import orjson
+import time
+from collections import OrderedDict
+from itertools import islice
 from loguru import logger
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 # Import the AsyncCommManager instance for communication/logging if needed
 from protocols.communication import comm_manager
 
+SEARCH_TTL = 120  # seconds
+CACHE_MAX_ENTRIES = 512
+
 class DuckDuckGoSearchClient:
     def __init__(self, comm_manager=comm_manager):
         self.base_search_url = "https://duckduckgo.com/?q="
         self.search_api_url = "https://api.duckduckgo.com/?q="  # For Instant Answers API
         self.comm_manager = comm_manager  # Use the shared AsyncCommManager instance
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
         logger.info("DuckDuckGoSearchClient initialized.")
 
-    async def search_web(self, query: str) -> Dict[str, Any]:
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client, creating it on first use in the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(10.0, connect=3.0),
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+                follow_redirects=True,
+                headers={
+                    'Accept': 'application/json',
+                    'Accept-Encoding': 'gzip, br',
+                    'User-Agent': 'web-search-agent/1.0'
+                }
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _cache_get(self, key: Tuple[str, int]) -> Optional[Dict[str, Any]]:
+        """Return a cached result if it is younger than SEARCH_TTL."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, data = entry
+        if time.monotonic() - stored_at >= SEARCH_TTL:
+            self._cache.pop(key, None)
+            return None
+        self._cache.move_to_end(key)
+        return data
+
+    def _cache_put(self, key: Tuple[str, int], data: Dict[str, Any]) -> None:
+        """Store a result, evicting the least recently used entry when full."""
+        self._cache[key] = (time.monotonic(), data)
+        self._cache.move_to_end(key)
+        if len(self._cache) > CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    async def search_web(self, query: str, limit: int = 10) -> Dict[str, Any]:
         """
         Performs a web search using DuckDuckGo's Instant Answer API.
-        Returns structured results mapped into a common format.
+        Returns at most limit results mapped into a common format.
+        Successful results are cached briefly per normalized query and limit.
         """
+        cache_key = (query.strip().lower(), limit)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         full_url = f"{self.search_api_url}{query}&format=json&nohtml=1&noredirect=1&skip_disambig=1"
-        logger.info(f"Searching DuckDuckGo with query: {query}")
+        logger.debug("Searching DuckDuckGo with query: {}", query)
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(full_url, follow_redirects=True, timeout=10)
-                response.raise_for_status()
-                data = response.json()
+            response = await self._get_client().get(full_url)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
 
-                web_results_formatted = []
+            results = data.get("Results") or ()
+            related = data.get("RelatedTopics") or ()
 
-                if data.get("Results"):
-                    for res in data["Results"]:
-                        web_results_formatted.append({
-                            "title": res.get("Text"),
-                            "url": res.get("FirstURL"),
-                            "description": res.get("Text")  # Short description
-                        })
-                elif data.get("Abstract"):
-                    web_results_formatted.append({
-                        "title": data.get("Heading", query),
-                        "url": data.get("AbstractURL", f"https://duckduckgo.com/?q={query}"),
-                        "description": data.get("Abstract")
-                    })
+            web_results_formatted = [
+                {"title": res.get("Text"), "url": res.get("FirstURL"), "description": res.get("Text")}
+                for res in results[:limit]
+            ]
+            if not results and data.get("Abstract"):
+                web_results_formatted.append({
+                    "title": data.get("Heading", query),
+                    "url": data.get("AbstractURL", f"https://duckduckgo.com/?q={query}"),
+                    "description": data["Abstract"]
+                })
 
-                if data.get("RelatedTopics"):
-                    for topic in data["RelatedTopics"]:
-                        if "Text" in topic:
-                            web_results_formatted.append({
-                                "title": topic.get("Text", ""),
-                                "url": topic.get("FirstURL", ""),
-                                "description": topic.get("Text", "")
-                            })
+            remaining = limit - len(web_results_formatted)
+            if remaining > 0:
+                web_results_formatted.extend(islice(
+                    ({"title": topic.get("Text", ""), "url": topic.get("FirstURL", ""), "description": topic.get("Text", "")}
+                     for topic in related if "Text" in topic),
+                    remaining
+                ))
 
-                return {
-                    "web": {
-                        "results": web_results_formatted
-                    }
+            result = {
+                "web": {
+                    "results": web_results_formatted
                 }
+            }
+            self._cache_put(cache_key, result)
+            return result
 
         except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error searching DuckDuckGo: {e.response.status_code} - {e.response.text}")
+            logger.error("HTTP error searching DuckDuckGo: {} - {}", e.response.status_code, e.response.text)
             return {"error": f"HTTP error: {e.response.status_code}"}
         except httpx.RequestError as e:
-            logger.error(f"Network error searching DuckDuckGo: {e}")
+            logger.error("Network error searching DuckDuckGo: {}", e)
             return {"error": f"Network error: {e}"}
         except Exception as e:
-            logger.error(f"Unexpected error while searching DuckDuckGo: {e}", exc_info=True)
+            logger.error("Unexpected error while searching DuckDuckGo: {}", e)
             return {"error": f"Unexpected error: {e}"}
+
+    async def aclose(self):
+        """Close the pooled HTTP client."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
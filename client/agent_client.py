@@ -1,22 +1,46 @@
 # client/agent_client.py
 
 import asyncio
-import json
-import uuid
-from typing import Dict, Any, Optional
+import secrets
+import sys
+import time
+from typing import Dict, Any, Optional, Union
 from loguru import logger
 
+# uvloop is optional and has no Windows build; fall back to the stdlib loop
+uvloop = None
+if sys.platform != 'win32':
+    try:
+        import uvloop
+    except ImportError:
+        pass
+
+# aioconsole reads stdin on the event loop itself; without it input() runs in the executor
+try:
+    from aioconsole import ainput
+    AIOCONSOLE_AVAILABLE = True
+except ImportError:
+    AIOCONSOLE_AVAILABLE = False
+
 from client.connection_manager import ConnectionManager
 
 
+async def read_line(prompt: str = "> ") -> str:
+    """Read one line of console input without blocking the event loop"""
+    if AIOCONSOLE_AVAILABLE:
+        return await ainput(prompt)
+    return await asyncio.get_running_loop().run_in_executor(None, input, prompt)
+
+
 class AgentClient:
-    def __init__(self, api_url: str = None, websocket_url: str = None):
+    def __init__(self, api_url: str = None, websocket_url: str = None, verbose: bool = False):
         """
         Initialize AgentClient with backward compatibility
         
         Args:
             api_url: HTTP API URL (kept for backward compatibility, may be unused)
             websocket_url: WebSocket URL for real-time communication
+            verbose: Pretty-print server responses to stdout (interactive use)
         """
         # Handle different initialization patterns
         if websocket_url is None and api_url is not None:
@@ -37,8 +61,9 @@ class AgentClient:
             logger.info(f"API URL (for reference): {self.api_url}")
         
         self.connection_manager = ConnectionManager(self.websocket_url)
-        self.user_id: Optional[str] = None
+        self.user_id: Optional[Union[int, str]] = None
         self.is_running = False
+        self.verbose = verbose
         
         # Register message handlers
         self._setup_message_handlers()
@@ -71,19 +96,20 @@ class AgentClient:
         await self.connection_manager.disconnect()
         logger.info("Client disconnected")
     
-    async def send_query(self, query: str) -> Optional[str]:
+    async def send_query(self, query: str, query_id: Optional[str] = None) -> Optional[str]:
         """Send a query to the agent system and wait for response"""
         if not self.connection_manager.is_connected:
             logger.error("Cannot send query: not connected")
             return None
         
-        query_id = str(uuid.uuid4())
+        if query_id is None:
+            query_id = secrets.token_hex(8)  # 16 hex chars, unique enough within a session
         
         message = {
             "type": "query",
             "query": query,
             "query_id": query_id,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": time.monotonic()  # client-local monotonic clock
         }
         
         logger.info(f"Sending query: {query}")
@@ -129,8 +155,9 @@ class AgentClient:
         """Handle query received acknowledgment"""
         query_id = data.get("query_id")
         status = data.get("status")
-        logger.info(f"Query {query_id} received by server - Status: {status}")
-        print(f"⏳ Query received by server (ID: {query_id[:8]}...) - {status}")
+        logger.info("Query {} received by server - Status: {}", query_id, status)
+        if self.verbose:
+            print(f"⏳ Query received by server (ID: {str(query_id)[:8]}...) - {status}")
     
     async def _handle_query_response(self, data: Dict[str, Any]):
         """Handle query response from server"""
@@ -138,15 +165,18 @@ class AgentClient:
         response = data.get("response")
         status = data.get("status")
         
-        logger.info(f"Query Response (ID: {query_id})")
-        logger.info(f"Status: {status}")
-        logger.info(f"Response: {response}")
+        logger.info("Query Response (ID: {}) - Status: {} - Response: {}", query_id, status, response)
+        if not self.verbose:
+            return
         
-        print(f"\n🤖 Agent Response:")
-        print(f"   Query ID: {query_id[:8]}..." if query_id else "   Query ID: Unknown")
-        print(f"   Status: {status}")
-        print(f"   Response: {response}")
-        print()
+        query_id_line = f"   Query ID: {str(query_id)[:8]}..." if query_id else "   Query ID: Unknown"
+        sys.stdout.write(
+            f"\n🤖 Agent Response:\n"
+            f"{query_id_line}\n"
+            f"   Status: {status}\n"
+            f"   Response: {response}\n\n"
+        )
+        sys.stdout.flush()
     
     async def _handle_status_response(self, data: Dict[str, Any]):
         """Handle status response from server"""
@@ -154,40 +184,48 @@ class AgentClient:
         user_id = data.get('user_id', 'Unknown')
         server_uptime = data.get('server_uptime', 'Unknown')
         
-        logger.info("Server Status received:")
-        logger.info(f"  Active Connections: {active_connections}")
-        logger.info(f"  Your User ID: {user_id}")
-        logger.info(f"  Server Uptime: {server_uptime}")
+        logger.info("Server Status received - Active Connections: {}, Your User ID: {}, Server Uptime: {}",
+                    active_connections, user_id, server_uptime)
+        if not self.verbose:
+            return
         
-        print(f"\n📊 Server Status:")
-        print(f"   🔗 Active Connections: {active_connections}")
-        print(f"   🆔 Your User ID: {user_id}")
-        print(f"   ⏱️  Server Uptime: {server_uptime}")
-        print()
+        sys.stdout.write(
+            f"\n📊 Server Status:\n"
+            f"   🔗 Active Connections: {active_connections}\n"
+            f"   🆔 Your User ID: {user_id}\n"
+            f"   ⏱️  Server Uptime: {server_uptime}\n\n"
+        )
+        sys.stdout.flush()
     
     async def _handle_text_response(self, data: Dict[str, Any]):
         """Handle text response from server"""
         response = data.get("response")
         original = data.get("original_message")
         
-        logger.info(f"Text Response: {response}")
-        print(f"\n💬 Server Response:")
-        print(f"   {response}")
-        print()
+        logger.info("Text Response: {}", response)
+        if self.verbose:
+            sys.stdout.write(f"\n💬 Server Response:\n   {response}\n\n")
+            sys.stdout.flush()
     
     async def _handle_error_response(self, data: Dict[str, Any]):
         """Handle error response from server"""
         error_message = data.get("message")
         error_type = data.get("error_type", "Unknown")
         
-        logger.error(f"Server Error: {error_message}")
-        print(f"\n❌ Server Error:")
-        print(f"   Type: {error_type}")
-        print(f"   Message: {error_message}")
-        print()
+        logger.error("Server Error: {}", error_message)
+        if not self.verbose:
+            return
+        
+        sys.stdout.write(
+            f"\n❌ Server Error:\n"
+            f"   Type: {error_type}\n"
+            f"   Message: {error_message}\n\n"
+        )
+        sys.stdout.flush()
     
     async def run_interactive(self):
         """Run interactive client session"""
+        self.verbose = True
         if not await self.connect():
             print("❌ Failed to connect to server")
             return
@@ -208,8 +246,8 @@ class AgentClient:
         try:
             while self.is_running:
                 try:
-                    # Get user input
-                    user_input = input("> ").strip()
+                    # Read stdin without blocking so the receive loop keeps running
+                    user_input = (await read_line("> ")).strip()
                     
                     if user_input.lower() == 'exit':
                         break
@@ -230,9 +268,6 @@ class AgentClient:
                         # Send as regular text
                         await self.send_text(user_input)
                     
-                    # Small delay to allow responses to be processed
-                    await asyncio.sleep(0.1)
-                    
                 except KeyboardInterrupt:
                     print("\n🛑 Received interrupt signal...")
                     break
@@ -240,7 +275,7 @@ class AgentClient:
                     print("\n📄 End of input...")
                     break
                 except Exception as e:
-                    logger.error(f"Error in interactive loop: {e}", exc_info=True)
+                    logger.error(f"Error in interactive loop: {e}")
                     print(f"❌ Error: {e}")
                     
         finally:
@@ -266,4 +301,7 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -1,26 +1,50 @@
 # client/connection_manager.py
 
 import asyncio
-import json
+import orjson
+import random
 import time
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Tuple, Union
 from loguru import logger
 import websockets
 from websockets.exceptions import ConnectionClosed, WebSocketException
+from websockets.extensions.permessage_deflate import ClientPerMessageDeflateFactory
+
+# Keepalive frames have a fixed shape, so only the timestamp is serialized per send
+_PING_TEMPLATE = '{"type":"ping","timestamp":%.6f,"user_id":%s}'
+_HEARTBEAT_RESPONSE_TEMPLATE = '{"type":"heartbeat_response","timestamp":%s}'
 
 
 class ConnectionManager:
-    def __init__(self, url: str):
+    def __init__(self, url: str, base_delay: float = 0.25, max_delay: float = 10.0, jitter: bool = True):
         self.url = url
         self.websocket: Optional[websockets.WebSocketServerProtocol] = None
+        self._is_open: Callable[[], bool] = lambda: False
         self.is_connected = False
-        self.user_id: Optional[str] = None
-        self.message_handlers: Dict[str, Callable] = {}
+        # Servers may hand out a UUID string or a short session-scoped integer
+        self.user_id: Optional[Union[int, str]] = None
+        # Built-in message types share the dispatch table with registered handlers;
+        # each type maps to a tuple so several handlers can subscribe to it
+        self.message_handlers: Dict[str, Tuple[Callable, ...]] = {
+            "connection_established": (self._handle_connection_established,),
+            "heartbeat": (self._handle_heartbeat,),
+            "welcome": (self._handle_welcome,),
+            "pong": (self._handle_pong,),
+        }
         self.heartbeat_task: Optional[asyncio.Task] = None
         self.receive_task: Optional[asyncio.Task] = None
+        self.sender_task: Optional[asyncio.Task] = None
+        self.dispatch_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
         self.connection_timeout = 10.0
-        self.message_timeout = 30.0
-        self.reconnect_delay = 5.0
+        # Transport liveness is covered by websockets' own ping frames (ping_interval);
+        # this is the application ping the server uses to refresh its heartbeat record
+        self.heartbeat_interval = 20.0
+        # Reconnect backoff: base_delay doubling per attempt, capped at max_delay,
+        # scaled by a random 0.5-1.5 factor when jitter is on
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
         self.max_reconnect_attempts = 3
         self.reconnect_attempts = 0
         
@@ -31,6 +55,15 @@ class ConnectionManager:
         # Add a flag to track if we're expecting connection_established
         self.expecting_connection_established = False
         
+        # Outbound messages are queued and written by _sender_loop, which drains up to
+        # batch_size waiting messages per wakeup. Each entry carries a future that
+        # resolves to whether the frame was actually written.
+        self._send_queue: "asyncio.Queue[Tuple[Union[str, Dict[str, Any]], asyncio.Future]]" = asyncio.Queue()
+        self.batch_size = 32
+        
+        # Received frames wait here for _dispatch_loop so slow handlers don't hold up recv()
+        self._inbox: "asyncio.Queue[Union[str, bytes]]" = asyncio.Queue(maxsize=256)
+        
     async def connect(self) -> bool:
         """Connect to WebSocket server"""
         try:
@@ -40,6 +73,10 @@ class ConnectionManager:
             self.connection_established_event.clear()
             self.connection_established_data = None
             self.expecting_connection_established = True
+            # Sends still queued for a previous connection are failed, not replayed
+            self._fail_pending()
+            self._send_queue = asyncio.Queue()
+            self._inbox = asyncio.Queue(maxsize=256)
             
             # Connect with timeout
             self.websocket = await asyncio.wait_for(
@@ -47,18 +84,27 @@ class ConnectionManager:
                     self.url,
                     ping_interval=20,
                     ping_timeout=10,
-                    close_timeout=10
+                    close_timeout=10,
+                    max_size=2**22,
+                    # Large query responses compress well; without context takeover
+                    # the client keeps no compressor state between frames
+                    compression="deflate",
+                    extensions=[ClientPerMessageDeflateFactory(
+                        server_max_window_bits=15,
+                        client_no_context_takeover=True
+                    )]
                 ),
                 timeout=self.connection_timeout
             )
             
+            self._is_open = self._bind_open_check(self.websocket)
             logger.info("WebSocket connected successfully")
             
             # Start receiving messages BEFORE waiting for connection established
             self.receive_task = asyncio.create_task(self._receive_loop())
-            
-            # Wait a bit for initial messages
-            await asyncio.sleep(0.5)
+            self.dispatch_task = asyncio.create_task(self._dispatch_loop())
+            self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            self.sender_task = asyncio.create_task(self._sender_loop())
             
             # Try to wait for connection established message
             try:
@@ -83,7 +129,7 @@ class ConnectionManager:
             except asyncio.TimeoutError:
                 logger.warning("Timeout waiting for connection established message")
                 # Check if websocket is still open - if so, consider it connected
-                if self.websocket and self._is_websocket_open():
+                if self.websocket and self._is_open():
                     logger.info("WebSocket is still open, proceeding without connection_established message")
                     self.is_connected = True
                     self.reconnect_attempts = 0
@@ -98,7 +144,7 @@ class ConnectionManager:
             logger.error(f"Connection timeout after {self.connection_timeout}s")
             return False
         except Exception as e:
-            logger.error(f"Connection failed: {e}", exc_info=True)
+            logger.error(f"Connection failed: {e}")
             return False
     
     async def disconnect(self):
@@ -106,7 +152,15 @@ class ConnectionManager:
         self.is_connected = False
         self.expecting_connection_established = False
         
-        # Cancel tasks
+        # Cancel tasks; a pending reconnect is stopped too unless it is the caller
+        reconnect_task = self._reconnect_task
+        if reconnect_task and reconnect_task is not asyncio.current_task() and not reconnect_task.done():
+            reconnect_task.cancel()
+            try:
+                await reconnect_task
+            except asyncio.CancelledError:
+                pass
+        
         if self.receive_task and not self.receive_task.done():
             self.receive_task.cancel()
             try:
@@ -114,6 +168,21 @@ class ConnectionManager:
             except asyncio.CancelledError:
                 pass
         
+        if self.dispatch_task and not self.dispatch_task.done():
+            self.dispatch_task.cancel()
+            try:
+                await self.dispatch_task
+            except asyncio.CancelledError:
+                pass
+        
+        if self.sender_task and not self.sender_task.done():
+            self.sender_task.cancel()
+            try:
+                await self.sender_task
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending()
+        
         if self.heartbeat_task and not self.heartbeat_task.done():
             self.heartbeat_task.cancel()
             try:
@@ -128,6 +197,7 @@ class ConnectionManager:
             except Exception as e:
                 logger.warning(f"Error closing WebSocket: {e}")
             self.websocket = None
+        self._is_open = lambda: False
         
         self.user_id = None
         self.connection_established_event.clear()
@@ -135,171 +205,232 @@ class ConnectionManager:
         logger.info("WebSocket disconnected")
     
     async def send_json(self, message: Dict[str, Any]) -> bool:
-        """Send JSON message"""
-        if not self.is_connected or not self.websocket:
-            logger.error("Cannot send message: not connected")
-            return False
-        
-        try:
-            await self.websocket.send(json.dumps(message))
-            logger.debug(f"Sent message: {message}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send message: {e}")
-            await self._handle_connection_error()
-            return False
+        """Send JSON message; returns once it has been written (True) or dropped (False)"""
+        return await self._enqueue(message)
     
     async def send_text(self, text: str) -> bool:
-        """Send plain text message"""
+        """Send plain text message; returns once it has been written (True) or dropped (False)"""
+        return await self._enqueue(text)
+    
+    async def _enqueue(self, item: Union[str, Dict[str, Any]]) -> bool:
+        """Queue an outbound frame for _sender_loop and wait for the write to finish"""
         if not self.is_connected or not self.websocket:
             logger.error("Cannot send message: not connected")
             return False
         
+        sent = asyncio.get_running_loop().create_future()
+        self._send_queue.put_nowait((item, sent))
+        return await sent
+    
+    def _fail_pending(self):
+        """Resolve every queued send as failed and empty the queue"""
+        queue = self._send_queue
+        while not queue.empty():
+            _, sent = queue.get_nowait()
+            if not sent.done():
+                sent.set_result(False)
+    
+    async def _sender_loop(self):
+        """Drain the send queue, writing every message already waiting in one pass"""
+        queue = self._send_queue
+        items: List[Tuple[Union[str, Dict[str, Any]], asyncio.Future]] = []
         try:
-            await self.websocket.send(text)
-            logger.debug(f"Sent text: {text}")
-            return True
+            while True:
+                items = [await queue.get()]
+                while len(items) < self.batch_size and not queue.empty():
+                    items.append(queue.get_nowait())
+                
+                for item, sent in items:
+                    await self._send_frame(item)
+                    if not sent.done():
+                        sent.set_result(True)
+                items = []
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"Failed to send text: {e}")
-            await self._handle_connection_error()
-            return False
+            logger.error(f"Failed to send message: {e}")
+            # Reconnect from a separate task; disconnect() cancels this one
+            self._schedule_reconnect()
+        finally:
+            # Whatever was taken off the queue but not written is reported as failed
+            for _, sent in items:
+                if not sent.done():
+                    sent.set_result(False)
     
-    def add_message_handler(self, message_type: str, handler: Callable):
-        """Add handler for specific message type"""
-        self.message_handlers[message_type] = handler
+    async def _send_frame(self, item: Union[str, Dict[str, Any]]):
+        """Encode and send a single frame"""
+        if isinstance(item, str):
+            await self.websocket.send(item)
+        else:
+            # The servers read text frames, so send the orjson output as str
+            await self.websocket.send(orjson.dumps(item).decode())
+        logger.debug("Sent frame: {}", item)
+    
+    def add_message_handler(self, message_type: str, handler: Callable, replace: bool = True):
+        """Add handler for specific message type.
+
+        By default the handler replaces any existing ones for that type; pass
+        replace=False to run it alongside them.
+        """
+        if replace:
+            self.message_handlers[message_type] = (handler,)
+        else:
+            self.message_handlers[message_type] = self.message_handlers.get(message_type, ()) + (handler,)
     
     async def _receive_loop(self):
         """Main receive loop - this is the ONLY place that calls recv()"""
         try:
-            while self.websocket and self._is_websocket_open():
+            while self.websocket and self._is_open():
                 try:
-                    # Receive message with timeout
-                    message = await asyncio.wait_for(
-                        self.websocket.recv(),
-                        timeout=self.message_timeout
-                    )
-                    
-                    await self._handle_message(message)
-                    
-                except asyncio.TimeoutError:
-                    logger.debug("No message received within timeout - sending ping")
-                    await self._send_ping()
-                    continue
+                    message = await self.websocket.recv()
+                    await self._inbox.put(message)
                     
                 except ConnectionClosed:
                     logger.info("WebSocket connection closed by server")
                     break
                     
                 except Exception as e:
-                    logger.error(f"Error in receive loop: {e}", exc_info=True)
+                    logger.error(f"Error in receive loop: {e}")
                     break
                     
         except Exception as e:
-            logger.error(f"Receive loop error: {e}", exc_info=True)
+            logger.error(f"Receive loop error: {e}")
         finally:
             if self.is_connected:  # Only handle error if we were supposed to be connected
-                await self._handle_connection_error()
+                self._schedule_reconnect()
     
-    def _is_websocket_open(self) -> bool:
-        """Check if websocket is open - compatible with different websockets versions"""
-        if not self.websocket:
-            return False
-        
-        try:
-            # Try different attributes that might indicate connection state
-            if hasattr(self.websocket, 'closed'):
-                return not self.websocket.closed
-            elif hasattr(self.websocket, 'state'):
-                # For newer websockets versions
-                from websockets.protocol import State
-                return self.websocket.state == State.OPEN
-            elif hasattr(self.websocket, 'open'):
-                return self.websocket.open
-            else:
-                # Fallback - assume it's open if we have a websocket object
-                return True
-        except Exception:
-            return False
+    async def _dispatch_loop(self):
+        """Hand received frames to _handle_message in arrival order"""
+        inbox = self._inbox
+        while True:
+            message = await inbox.get()
+            await self._handle_message(message)
     
-    async def _handle_message(self, message: str):
+    @staticmethod
+    def _bind_open_check(websocket) -> Callable[[], bool]:
+        """Pick the open-state probe for this websockets version once per connection"""
+        if hasattr(websocket, 'closed'):
+            return lambda: not websocket.closed
+        if hasattr(websocket, 'state'):
+            # For newer websockets versions
+            from websockets.protocol import State
+            return lambda: websocket.state is State.OPEN
+        if hasattr(websocket, 'open'):
+            return lambda: websocket.open
+        # Fallback - assume it's open if we have a websocket object
+        return lambda: True
+    
+    async def _handle_message(self, message: Union[str, bytes]):
         """Handle received message"""
         try:
-            # Try to parse as JSON first
-            try:
-                data = json.loads(message)
-                message_type = data.get("type", "unknown")
-                
-                logger.debug(f"Received JSON message type: {message_type}")
-                
-                # Handle built-in message types
-                if message_type == "connection_established":
-                    self.connection_established_data = data
-                    self.connection_established_event.set()
-                    self.expecting_connection_established = False
-                    logger.debug("Connection established message handled")
-                elif message_type == "heartbeat":
-                    await self._handle_heartbeat(data)
-                elif message_type == "welcome":
-                    logger.info(f"Welcome message: {data.get('message')}")
-                elif message_type == "pong":
-                    logger.debug("Received pong")
-                else:
-                    # Handle with registered handlers
-                    handler = self.message_handlers.get(message_type)
-                    if handler:
-                        await handler(data)
-                    else:
-                        logger.debug(f"No handler for message type: {message_type}")
-                        
-            except json.JSONDecodeError:
+            # Binary frames are treated as UTF-8 text, as json.loads used to accept them
+            if isinstance(message, (bytes, bytearray)):
+                message = message.decode()
+            
+            # Only frames that open like a JSON object or array are worth parsing
+            data = None
+            if message.lstrip()[:1] in ('{', '['):
+                try:
+                    data = orjson.loads(message)
+                except orjson.JSONDecodeError:
+                    pass
+            
+            if data is None:
                 # Handle as plain text
-                logger.info(f"Received text message: {message}")
+                logger.info("Received text message: {}", message)
                 
-                # Check if this might be a connection established message in text format
-                if self.expecting_connection_established and ("connected" in message.lower() or "established" in message.lower()):
-                    logger.info("Detected connection established in text format")
-                    self.connection_established_data = {"message": message}
-                    self.connection_established_event.set()
-                    self.expecting_connection_established = False
+                # Only probe for a text-format handshake while one is pending
+                if self.expecting_connection_established:
+                    self._handshake_text_probe(message)
+                return
+            
+            await self._dispatch(data)
                     
         except Exception as e:
-            logger.error(f"Error handling message: {e}", exc_info=True)
+            logger.error(f"Error handling message: {e}")
+    
+    def _handshake_text_probe(self, message: str):
+        """Treat a plain-text greeting as connection established"""
+        lowered = message.lower()
+        if "connected" in lowered or "established" in lowered:
+            logger.info("Detected connection established in text format")
+            self.connection_established_data = {"message": message}
+            self.connection_established_event.set()
+            self.expecting_connection_established = False
+    
+    async def _dispatch(self, data: Dict[str, Any]):
+        """Route a decoded message to its handler with a single table lookup"""
+        message_type = data.get("type", "unknown")
+        
+        logger.debug("Received message type: {}", message_type)
+        
+        handlers = self.message_handlers.get(message_type)
+        if handlers:
+            for handler in handlers:
+                await handler(data)
+        else:
+            logger.debug("No handler for message type: {}", message_type)
+    
+    async def _handle_connection_established(self, data: Dict[str, Any]):
+        """Record the handshake payload and wake up connect()"""
+        self.connection_established_data = data
+        self.connection_established_event.set()
+        self.expecting_connection_established = False
+        logger.debug("Connection established message handled")
+    
+    async def _handle_welcome(self, data: Dict[str, Any]):
+        """Log the server welcome message"""
+        logger.info(f"Welcome message: {data.get('message')}")
+    
+    async def _handle_pong(self, data: Dict[str, Any]):
+        """Handle pong from server"""
+        logger.debug("Received pong")
     
     async def _handle_heartbeat(self, data: Dict[str, Any]):
         """Handle heartbeat from server"""
         logger.debug("Received heartbeat, sending response")
-        await self.send_json({
-            "type": "heartbeat_response",
-            "timestamp": data.get("timestamp")
-        })
+        timestamp = orjson.dumps(data.get("timestamp")).decode()
+        await self.send_text(_HEARTBEAT_RESPONSE_TEMPLATE % timestamp)
     
-    async def _send_ping(self):
-        """Send ping to server"""
-        if self.websocket and self._is_websocket_open():
-            try:
-                await self.send_json({
-                    "type": "ping",
-                    "timestamp": time.time()
-                })
-            except Exception as e:
-                logger.warning(f"Failed to send ping: {e}")
+    async def _heartbeat_loop(self):
+        """Send the application ping on a fixed interval while connected"""
+        while self.websocket and self._is_open():
+            await asyncio.sleep(self.heartbeat_interval)
+            if self.is_connected:
+                user_id = orjson.dumps(self.user_id).decode()
+                await self.send_text(_PING_TEMPLATE % (time.time(), user_id))
+    
+    def _schedule_reconnect(self):
+        """Run _handle_connection_error in a task kept on self so disconnect() can cancel it"""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._handle_connection_error())
     
     async def _handle_connection_error(self):
-        """Handle connection errors and attempt reconnection"""
+        """Handle connection errors and attempt reconnection with exponential backoff"""
         if not self.is_connected:
             return
             
         self.is_connected = False
         logger.warning("Connection lost, attempting to reconnect...")
         
-        if self.reconnect_attempts < self.max_reconnect_attempts:
+        # Stop the old connection's workers; this coroutine may be running in one of them
+        current = asyncio.current_task()
+        for task in (self.receive_task, self.dispatch_task, self.sender_task, self.heartbeat_task):
+            if task and task is not current and not task.done():
+                task.cancel()
+        self._fail_pending()
+        
+        while self.reconnect_attempts < self.max_reconnect_attempts:
+            delay = min(self.base_delay * 2 ** self.reconnect_attempts, self.max_delay)
+            if self.jitter:
+                delay *= 0.5 + random.random()
             self.reconnect_attempts += 1
-            await asyncio.sleep(self.reconnect_delay)
+            await asyncio.sleep(delay)
             
             logger.info(f"Reconnection attempt {self.reconnect_attempts}/{self.max_reconnect_attempts}")
-            success = await self.connect()
+            if await self.connect():
+                return
             
-            if not success:
-                logger.error(f"Reconnection attempt {self.reconnect_attempts} failed")
-        else:
-            logger.error("Maximum reconnection attempts reached")
\ No newline at end of file
+            logger.error(f"Reconnection attempt {self.reconnect_attempts} failed")
+        
+        logger.error("Maximum reconnection attempts reached")
\ No newline at end of file
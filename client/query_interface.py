@@ -1,40 +1,100 @@
 # multi_agent_system/client/query_interface.py
 
 import asyncio
+import secrets
 import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from loguru import logger
 
-from client.agent_client import AgentClient
+from client.agent_client import AgentClient, read_line
 from config.settings import settings
 
-# Add a response queue to handle responses properly
+SEP = "-" * 50
+RESPONSE_TYPES = ("query_response", "agent_response", "orchestrator_response")
+
+RESPONSE_CACHE_TTL = 600  # seconds a final answer is replayed for an identical query
+RESPONSE_CACHE_MAX_ENTRIES = 128
+NOCACHE_PREFIX = "!nocache"
+# Queries still waiting for a completed answer; the oldest are forgotten past this
+MAX_PENDING_QUERIES = 128
+# Server message types that end a query without an answer worth caching
+QUERY_ERROR_TYPES = ("query_error", "error")
+
 class QueryInterface:
     def __init__(self, api_url: str, websocket_url: str):
         self.api_url = api_url
         self.websocket_url = websocket_url
         self.client = AgentClient(api_url, websocket_url)
-        self._response_queue = asyncio.Queue()
+        self._stop_event = asyncio.Event()
+        self._resp_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._pending_queries: "OrderedDict[str, str]" = OrderedDict()  # query_id -> cache key
         self.is_running = False
+        # Errors are still reported by AgentClient; this only forgets the pending query.
+        # Registered once here because appending again on every reconnect would stack copies.
+        for message_type in QUERY_ERROR_TYPES:
+            self.client.connection_manager.add_message_handler(message_type, self._on_query_error, replace=False)
         
     async def setup_response_handling(self):
         """Setup response handling for the client"""
-        # Add custom message handlers
-        self.client.connection_manager.add_message_handler("query_response", self._handle_query_response)
-        self.client.connection_manager.add_message_handler("agent_response", self._handle_agent_response)
-        self.client.connection_manager.add_message_handler("orchestrator_response", self._handle_orchestrator_response)
-        
-    async def _handle_query_response(self, data):
-        """Handle query responses"""
-        await self._response_queue.put(data)
-        
-    async def _handle_agent_response(self, data):
-        """Handle agent responses"""
-        await self._response_queue.put(data)
-        
-    async def _handle_orchestrator_response(self, data):
-        """Handle orchestrator responses"""
-        await self._response_queue.put(data)
-        
+        # One handler covers every response type. It replaces AgentClient's own
+        # query_response handler so each answer is handled once, and re-registering
+        # on reconnect is harmless.
+        for message_type in RESPONSE_TYPES:
+            self.client.connection_manager.add_message_handler(message_type, self._on_message, replace=True)
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached final response for a query if it is younger than the TTL."""
+        entry = self._resp_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, message = entry
+        if time.monotonic() - stored_at >= RESPONSE_CACHE_TTL:
+            self._resp_cache.pop(key, None)
+            return None
+        self._resp_cache.move_to_end(key)
+        return message
+
+    def _cache_put(self, key: str, message: Dict[str, Any]) -> None:
+        """Store a final response, evicting the least recently used entry when full."""
+        self._resp_cache[key] = (time.monotonic(), message)
+        self._resp_cache.move_to_end(key)
+        if len(self._resp_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+            self._resp_cache.popitem(last=False)
+
+    async def _on_message(self, message: Dict[str, Any]):
+        """Print a query, agent or orchestrator response as soon as it arrives"""
+        try:
+            # Remember completed answers so an identical query can be replayed locally;
+            # only an explicit "completed" status marks the final answer
+            if message.get("status") == "completed" and message.get("is_final", True):
+                key = self._pending_queries.pop(message.get("query_id"), None)
+                if key is not None:
+                    self._cache_put(key, message)
+
+            # Only response types are routed here, so connection messages never arrive
+            sender = message.get("sender", "System")
+            content = message.get("content") or message.get("response", "")
+
+            if sender == "orchestrator":
+                agent_used = message.get("agent_used", "N/A")
+                prefix = f"[{sender} via {agent_used}]" if agent_used != "N/A" else f"[{sender}]"
+                if message.get("is_final", True):
+                    sys.stdout.write(f"\n{prefix}: {content}\n{SEP}\nEnter your next query:\n")
+                else:
+                    sys.stdout.write(f"\n{prefix}: {content}\n")
+            else:
+                sys.stdout.write(f"\n[{sender}]: {content}\n")
+            sys.stdout.flush()
+
+        except Exception as e:
+            logger.error(f"Error printing response: {e}", exc_info=True)
+
+    async def _on_query_error(self, message):
+        """Stop tracking a query the server reported as failed"""
+        self._pending_queries.pop(message.get("query_id"), None)
+
     async def connect(self, timeout=30):
         """Connect to the multi-agent system"""
         await self.setup_response_handling()
@@ -43,27 +103,50 @@ class QueryInterface:
     async def disconnect(self):
         """Disconnect from the system"""
         self.is_running = False
+        self._stop_event.set()
+        self._pending_queries.clear()
         await self.client.disconnect()
         
     async def send_query(self, query: str):
-        """Send a query to the system"""
-        return await self.client.send_query(query)
+        """Send a query to the system, answering repeats from the response cache.
+
+        Prefix the query with "!nocache" to skip the cache and ask the server again.
+        """
+        query = query.strip()
+        bypass = query.startswith(NOCACHE_PREFIX)
+        if bypass:
+            query = query[len(NOCACHE_PREFIX):].strip()
+            if not query:
+                return None
+
+        if not bypass:
+            cached = self._cache_get(query)
+            if cached is not None:
+                await self._on_message(cached)
+                return f"Query '{query}' answered from cache"
+
+        query_id = secrets.token_hex(8)
+        # Tracked before sending so a fast reply can't arrive ahead of the entry
+        self._pending_queries[query_id] = query
+        if len(self._pending_queries) > MAX_PENDING_QUERIES:
+            self._pending_queries.popitem(last=False)
+        result = await self.client.send_query(query, query_id=query_id)
+        if not result:
+            self._pending_queries.pop(query_id, None)
+        return result
         
     @property
     def is_connected(self):
         """Check if connected"""
         return self.client.connection_manager.is_connected
-        
-    async def get_response(self):
-        """Get a response from the queue"""
-        try:
-            return await asyncio.wait_for(self._response_queue.get(), timeout=1.0)
-        except asyncio.TimeoutError:
-            return None
+
+    async def wait_closed(self):
+        """Wait until the interface is shut down"""
+        await self._stop_event.wait()
 
 async def main():
-    api_url = f"http://{settings.AGENT_SERVER_HOST}:{settings.AGENT_SERVER_PORT}{settings.API_V1_STR}"
-    websocket_url = f"ws://{settings.AGENT_SERVER_HOST}:{settings.WEBSOCKET_PORT}/ws"
+    api_url = settings.api_url
+    websocket_url = settings.websocket_url
     
     logger.remove()  # Remove default logger
     logger.add(sys.stderr, level="INFO")  # Keep info and above for client console
@@ -89,7 +172,7 @@ async def main():
             
         print("✅ Connected successfully!")
         print("Type your query and press Enter. Type 'exit' to quit.")
-        print("-" * 50)
+        print(SEP)
         
     except Exception as e:
         print(f"❌ Connection error: {e}")
@@ -98,53 +181,17 @@ async def main():
 
     interface.is_running = True
 
-    # Start a background task to receive and print responses
+    # Responses are printed by the handlers as they arrive; this task only
+    # lives until the interface shuts down
     async def response_printer():
-        while interface.is_running:
-            try:
-                message = await interface.get_response()
-                if message is None:
-                    continue
-                    
-                # Filter out connection messages
-                if message.get("type") == "connection_established":
-                    continue
-                    
-                sender = message.get("sender", "System")
-                content = message.get("content", message.get("response", ""))
-                agent_used = message.get("agent_used", "N/A")
-                is_final = message.get("is_final", True)
-                query_id = message.get("query_id", "")
-
-                # Format the response
-                prefix = f"[{sender}"
-                if sender == "orchestrator" and agent_used != "N/A":
-                    prefix += f" via {agent_used}"
-                prefix += "]"
-                
-                print(f"\n{prefix}: {content}")
-                
-                if is_final and sender == "orchestrator":
-                    print("-" * 50)
-                    print("Enter your next query:")
-
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in response printer: {e}", exc_info=True)
+        await interface.wait_closed()
 
     response_task = asyncio.create_task(response_printer())
 
     try:
         while interface.is_running:
             try:
-                # Use asyncio.to_thread for blocking input in newer Python versions
-                # For older versions, you might need a different approach
-                if hasattr(asyncio, 'to_thread'):
-                    query = await asyncio.to_thread(input, "> ")
-                else:
-                    # Fallback for older Python versions
-                    query = await asyncio.get_event_loop().run_in_executor(None, input, "> ")
+                query = await read_line("> ")
                     
                 if query.lower() in ['exit', 'quit', 'q']:
                     break
@@ -1,9 +1,89 @@
 # config/settings.py
+import os
 import yaml
+from functools import cached_property
+from urllib.parse import urlsplit
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from loguru import logger
 from typing import Dict, Any, Optional
 
+# libyaml's C loader when PyYAML was built with it, else the pure-Python one
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+AGENT_CONFIG_PATH = "config/agent_config.yaml"
+
+# Parsed agent_config.yaml shared by Settings and AgentRegistry, keyed on file mtime
+_YAML_CACHE: Optional[Dict[str, Any]] = None
+_YAML_MTIME: Optional[float] = None
+
+
+def _get_yaml() -> Dict[str, Any]:
+    """Return the parsed agent config, re-reading the file only when its mtime changes."""
+    global _YAML_CACHE, _YAML_MTIME
+    mtime = os.stat(AGENT_CONFIG_PATH).st_mtime
+    if _YAML_CACHE is None or mtime != _YAML_MTIME:
+        with open(AGENT_CONFIG_PATH, "r") as f:
+            _YAML_CACHE = yaml.load(f, Loader=_YamlLoader) or {}
+        _YAML_MTIME = mtime
+        _ENDPOINT_CACHE.clear()
+        _PORT_CACHE.clear()
+    return _YAML_CACHE
+
+
+def load_agent_configs() -> Dict[str, Dict[str, Any]]:
+    """Return the 'agents' section of agent_config.yaml as a shallow copy callers may modify."""
+    return dict(_get_yaml().get("agents") or {})
+
+
+# Memoized endpoint/port lookups for the agent_config.yaml at _YAML_MTIME. Misses
+# (None) are never stored, so an agent added to the file is picked up right away.
+_ENDPOINT_CACHE: Dict[str, str] = {}
+_PORT_CACHE: Dict[str, int] = {}
+
+
+def _drop_stale_lookups() -> None:
+    """Clear the memoized lookups if agent_config.yaml changed since it was parsed."""
+    try:
+        mtime = os.stat(AGENT_CONFIG_PATH).st_mtime
+    except OSError:
+        mtime = None
+    if mtime is None or mtime != _YAML_MTIME:
+        _ENDPOINT_CACHE.clear()
+        _PORT_CACHE.clear()
+
+
+def _agent_endpoint(agent_name: str) -> Optional[str]:
+    """Memoized a2a_endpoint lookup."""
+    _drop_stale_lookups()
+    endpoint = _ENDPOINT_CACHE.get(agent_name)
+    if endpoint is None:
+        config = settings.load_agent_config(agent_name)
+        endpoint = config.get("a2a_endpoint") if config else None
+        if endpoint is not None:
+            _ENDPOINT_CACHE[agent_name] = endpoint
+    return endpoint
+
+
+def _agent_port(agent_name: str) -> Optional[int]:
+    """Memoized port lookup."""
+    endpoint = _agent_endpoint(agent_name)
+    if not endpoint:
+        return None
+    port = _PORT_CACHE.get(agent_name)
+    if port is None:
+        try:
+            # Port from a URL like "http://127.0.0.1:5001/a2a"; also handles IPv6 hosts
+            port = urlsplit(endpoint).port
+        except ValueError as e:
+            logger.error(f"Failed to extract port from endpoint {endpoint}: {e}")
+            return None
+        if port is not None:
+            _PORT_CACHE[agent_name] = port
+    return port
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
    
@@ -31,11 +111,20 @@ class Settings(BaseSettings):
     PERPLEXITY_MODEL: str = "llama-3.1-sonar-small-128k-online"
     PERPLEXITY_BASE_URL: str = "https://api.perplexity.ai"
    
+    @cached_property
+    def api_url(self) -> str:
+        """Base URL of the agent server's REST API."""
+        return f"http://{self.AGENT_SERVER_HOST}:{self.AGENT_SERVER_PORT}{self.API_V1_STR}"
+
+    @cached_property
+    def websocket_url(self) -> str:
+        """URL of the client WebSocket endpoint."""
+        return f"ws://{self.AGENT_SERVER_HOST}:{self.WEBSOCKET_PORT}/ws"
+
     def load_agent_config(self, agent_name: str) -> Optional[Dict[str, Any]]:
         """Load agent configuration from YAML file."""
         try:
-            with open("config/agent_config.yaml", "r") as f:
-                data = yaml.safe_load(f)
+            data = _get_yaml()
            
             config = data.get("agents", {}).get(agent_name)
             if not config:
@@ -46,7 +135,7 @@ class Settings(BaseSettings):
             return config
            
         except FileNotFoundError:
-            logger.error(f"Agent config file 'config/agent_config.yaml' not found.")
+            logger.error(f"Agent config file '{AGENT_CONFIG_PATH}' not found.")
             return None
         except yaml.YAMLError as e:
             logger.error(f"Error parsing YAML config: {e}")
@@ -57,23 +146,11 @@ class Settings(BaseSettings):
    
     def get_agent_endpoint(self, agent_name: str) -> Optional[str]:
         """Get the A2A endpoint for a specific agent."""
-        config = self.load_agent_config(agent_name)
-        if config:
-            return config.get("a2a_endpoint")
-        return None
+        return _agent_endpoint(agent_name)
    
     def get_agent_port(self, agent_name: str) -> Optional[int]:
         """Extract port from agent's a2a_endpoint."""
-        endpoint = self.get_agent_endpoint(agent_name)
-        if endpoint:
-            try:
-                # Extract port from URL like "http://127.0.0.1:5001/a2a"
-                port_str = endpoint.split(":")[-1].split("/")[0]
-                return int(port_str)
-            except (ValueError, IndexError) as e:
-                logger.error(f"Failed to extract port from endpoint {endpoint}: {e}")
-                return None
-        return None
+        return _agent_port(agent_name)
    
     def validate_required_keys(self) -> bool:
         """Validate that required API keys are present."""
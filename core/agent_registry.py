@@ -1,30 +1,36 @@
 # multi_agent_system/core/agent_registry.py
 
+import threading
 from typing import Dict, Optional, List
 from core.base_agent import AgentToolDefinition
+from config.settings import AGENT_CONFIG_PATH, load_agent_configs
 from loguru import logger
 import yaml
 
 class AgentRegistry:
     _instance = None
+    _lock = threading.Lock()
     _agents_configs: Dict[str, Dict] = {}
     _registered_a2a_agents: Dict[str, AgentToolDefinition] = {} # Tracks actively registered A2A agents
+    _tool_name_index: Dict[str, AgentToolDefinition] = {} # tool_name (from agent_config) -> registered agent
 
     def __new__(cls):
+        # Double-checked so the fast path takes no lock and configs load exactly once
         if cls._instance is None:
-            cls._instance = super(AgentRegistry, cls).__new__(cls)
-            cls._instance._load_agent_configs()
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(AgentRegistry, cls).__new__(cls)
+                    instance._load_agent_configs()
+                    cls._instance = instance
         return cls._instance
 
     def _load_agent_configs(self):
         # Load static agent configurations from agent_config.yaml
-        config_path = "config/agent_config.yaml"
         try:
-            with open(config_path, 'r') as f:
-                self._agents_configs = yaml.safe_load(f).get('agents', {})
-            logger.info(f"Loaded agent configurations from {config_path}")
+            self._agents_configs = load_agent_configs()
+            logger.info(f"Loaded agent configurations from {AGENT_CONFIG_PATH}")
         except FileNotFoundError:
-            logger.error(f"Agent configuration file not found at {config_path}")
+            logger.error(f"Agent configuration file not found at {AGENT_CONFIG_PATH}")
         except yaml.YAMLError as e:
             logger.error(f"Error parsing agent_config.yaml: {e}")
 
@@ -39,12 +45,18 @@ class AgentRegistry:
         if agent_tool_def.agent_id in self._registered_a2a_agents:
             logger.warning(f"Agent '{agent_tool_def.name}' ({agent_tool_def.agent_id}) already registered. Updating.")
         self._registered_a2a_agents[agent_tool_def.agent_id] = agent_tool_def
+        config = self.get_agent_config(agent_tool_def.agent_id)
+        if config and config.get("tool_name"):
+            self._tool_name_index[config["tool_name"]] = agent_tool_def
         logger.info(f"Registered A2A agent: {agent_tool_def.name} ({agent_tool_def.agent_id}) at {agent_tool_def.a2a_endpoint}")
 
     def unregister_a2a_agent(self, agent_id: str):
         """Unregisters an A2A agent."""
         if agent_id in self._registered_a2a_agents:
             del self._registered_a2a_agents[agent_id]
+            config = self.get_agent_config(agent_id)
+            if config and config.get("tool_name"):
+                self._tool_name_index.pop(config["tool_name"], None)
             logger.info(f"Unregistered A2A agent: {agent_id}")
         else:
             logger.warning(f"Attempted to unregister unknown A2A agent: {agent_id}")
@@ -55,12 +67,7 @@ class AgentRegistry:
 
     def get_a2a_tool_definition(self, tool_name: str) -> Optional[AgentToolDefinition]:
         """Finds an A2A tool definition by its given tool_name (from agent_config)."""
-        for agent_id, agent_def in self._registered_a2a_agents.items():
-            # Match the tool_name from agent_config.yaml to the registered agent's tool_name
-            config = self.get_agent_config(agent_id)
-            if config and config.get("tool_name") == tool_name:
-                return agent_def
-        return None
+        return self._tool_name_index.get(tool_name)
 
 # Singleton instance
 agent_registry = AgentRegistry()
\ No newline at end of file
@@ -24,7 +24,7 @@ async def main():
     print()
     
     # Create client with only websocket_url (updated to match new API)
-    client = AgentClient(websocket_url)
+    client = AgentClient(websocket_url, verbose=True)
     
     try:
         # Connect to the system
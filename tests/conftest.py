@@ -0,0 +1,20 @@
+# multi_agent_system/tests/conftest.py
+
+import pytest
+from types import SimpleNamespace
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Return a helper that swaps the time module seen by the given modules for a settable clock.
+
+    Only those modules' references are replaced, so asyncio's own clock keeps running.
+    """
+    now = [1000.0]
+    fake_time = SimpleNamespace(monotonic=lambda: now[0])
+
+    def install(*modules):
+        for module in modules:
+            monkeypatch.setattr(f"{module}.time", fake_time)
+        return now
+
+    return install
@@ -0,0 +1,85 @@
+# multi_agent_system/tests/test_news_agent.py
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from agents.news_agent.news_agent import NewsAgent
+from agents.news_agent.news_client import NewsAPIClient
+
+ARTICLES = {
+    "articles": [
+        {"title": "Chip news", "source": {"name": "Wire"}, "description": "A long enough description", "url": "http://a"},
+        {"title": "Robot news", "source": {"name": "Post"}, "description": "", "url": "http://b"},
+    ]
+}
+
+@pytest.fixture
+def news_agent():
+    # Skip A2AServer.__init__ (it needs a served URL); the streaming path only uses news_client
+    agent = NewsAgent.__new__(NewsAgent)
+    agent.news_client = AsyncMock()
+    agent.news_client.get_top_headlines.return_value = ARTICLES
+    return agent
+
+def _message(text):
+    return SimpleNamespace(content=SimpleNamespace(text=text))
+
+@pytest.mark.asyncio
+async def test_stream_response_yields_header_then_articles(news_agent):
+    chunks = [chunk async for chunk in news_agent.stream_response(_message("Latest technology news in Canada"))]
+    assert len(chunks) == 3
+    assert chunks[0] == "📰 Latest news for technology category (CA):\n\n"
+    assert "**Chip news**" in chunks[1] and "Wire" in chunks[1] and "📝" in chunks[1]
+    assert "**Robot news**" in chunks[2] and "📝" not in chunks[2]
+    assert all(chunk.endswith("\n") for chunk in chunks)
+    news_agent.news_client.get_top_headlines.assert_awaited_once_with(category="technology", q=None, country="ca")
+
+@pytest.mark.asyncio
+async def test_stream_response_streams_each_category(news_agent):
+    chunks = [chunk async for chunk in news_agent.stream_response(_message("sports and business news"))]
+    assert [c.split(" category")[0] for c in chunks if c.startswith("📰")] == [
+        "📰 Latest news for sports", "📰 Latest news for business"
+    ]
+    assert news_agent.news_client.get_top_headlines.await_count == 2
+
+@pytest.mark.asyncio
+async def test_stream_response_without_intent_asks_for_topic(news_agent):
+    chunks = [chunk async for chunk in news_agent.stream_response(_message("hello there"))]
+    assert len(chunks) == 1 and chunks[0].startswith("Please specify a news category")
+    news_agent.news_client.get_top_headlines.assert_not_awaited()
+
+@pytest.mark.parametrize("text,expected", [
+    ("latest technology news", ["technology"]),
+    ("sports and business headlines", ["sports", "business"]),
+    ("business, then sports, then business again", ["business", "sports"]),
+    ("he said it was fine", []),
+])
+def test_extract_category_from_text(news_agent, text, expected):
+    assert news_agent._extract_category_from_text(text) == expected
+
+def test_extract_keyword_from_text(news_agent):
+    assert news_agent._extract_keyword_from_text("tell me about elections today") == "elections"
+    assert news_agent._extract_keyword_from_text("sports") is None
+
+@pytest.mark.asyncio
+async def test_get_many_headlines_fetches_each_query():
+    client = NewsAPIClient(api_key="test")
+    fetched = []
+
+    async def fake_fetch_one(self, category=None, q=None, country="us"):
+        fetched.append((category, country))
+        return {"articles": [{"title": category}]}
+
+    # NewsAPIClient uses __slots__, so the fetch is patched on the class
+    with patch.object(NewsAPIClient, "_fetch_one", fake_fetch_one):
+        results = await client.get_many_headlines([{"category": "sports"}, {"category": "business", "country": "uk"}])
+    assert [r["articles"][0]["title"] for r in results] == ["sports", "business"]
+    assert fetched == [("sports", "us"), ("business", "uk")]
+
+@pytest.mark.parametrize("text,expected", [
+    ("news from the united kingdom", "uk"),
+    ("headlines in canada", "ca"),
+    ("what is happening", "us"),
+])
+def test_extract_country_from_text(news_agent, text, expected):
+    assert news_agent._extract_country_from_text(text) == expected
@@ -0,0 +1,80 @@
+# multi_agent_system/tests/test_query_interface.py
+
+import pytest
+from unittest.mock import AsyncMock
+from client.query_interface import QueryInterface, RESPONSE_CACHE_TTL
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock("client.query_interface")
+
+@pytest.fixture
+def interface():
+    qi = QueryInterface("http://localhost:8000", "ws://localhost:8000/ws")
+    qi.client.send_query = AsyncMock(return_value=True)
+    return qi
+
+def _sent_query_id(interface):
+    return interface.client.send_query.await_args.kwargs["query_id"]
+
+def _answer(query_id, **extra):
+    return {"type": "query_response", "query_id": query_id, "sender": "orchestrator",
+            "content": "sunny", "status": "completed", **extra}
+
+@pytest.mark.asyncio
+async def test_completed_answer_is_replayed_from_cache(interface, clock):
+    await interface.send_query("weather in paris")
+    await interface._on_message(_answer(_sent_query_id(interface)))
+
+    result = await interface.send_query("  weather in paris ")
+    assert result == "Query 'weather in paris' answered from cache"
+    assert interface.client.send_query.await_count == 1
+    assert not interface._pending_queries
+
+@pytest.mark.asyncio
+async def test_cached_answer_expires(interface, clock):
+    await interface.send_query("weather in paris")
+    await interface._on_message(_answer(_sent_query_id(interface)))
+
+    clock[0] += RESPONSE_CACHE_TTL
+    assert await interface.send_query("weather in paris") is True
+    assert interface.client.send_query.await_count == 2
+
+@pytest.mark.asyncio
+async def test_nocache_prefix_bypasses_cache(interface, clock):
+    await interface.send_query("weather in paris")
+    await interface._on_message(_answer(_sent_query_id(interface)))
+
+    assert await interface.send_query("!nocache weather in paris") is True
+    interface.client.send_query.assert_awaited_with("weather in paris", query_id=_sent_query_id(interface))
+    assert interface.client.send_query.await_count == 2
+    assert await interface.send_query("!nocache   ") is None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("extra", [{"status": "processing"}, {"status": None}, {"is_final": False}])
+async def test_only_completed_final_answers_are_cached(interface, clock, extra):
+    await interface.send_query("weather in paris")
+    await interface._on_message(_answer(_sent_query_id(interface), **extra))
+
+    assert await interface.send_query("weather in paris") is True
+    assert interface.client.send_query.await_count == 2
+
+@pytest.mark.asyncio
+async def test_failed_send_and_query_error_forget_pending(interface):
+    interface.client.send_query.return_value = False
+    await interface.send_query("weather in paris")
+    assert not interface._pending_queries
+
+    interface.client.send_query.return_value = True
+    await interface.send_query("weather in rome")
+    await interface._on_query_error({"type": "query_error", "query_id": _sent_query_id(interface)})
+    assert not interface._pending_queries
+
+@pytest.mark.asyncio
+async def test_reconnect_does_not_stack_handlers(interface):
+    for _ in range(3):
+        await interface.setup_response_handling()
+    handlers = interface.client.connection_manager.message_handlers
+    assert handlers["error"] == (interface.client._handle_error_response, interface._on_query_error)
+    assert handlers["query_error"] == (interface._on_query_error,)
+    assert handlers["query_response"] == (interface._on_message,)
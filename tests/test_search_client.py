@@ -0,0 +1,45 @@
+# multi_agent_system/tests/test_search_client.py
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from agents.web_search_agent.search_client import DuckDuckGoSearchClient, SEARCH_TTL
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock("agents.web_search_agent.search_client")
+
+def _search_response(payload):
+    response = AsyncMock()
+    response.raise_for_status = lambda: None
+    response.content = payload
+    return response
+
+@pytest.mark.asyncio
+async def test_search_cache_hit_and_expiry(clock):
+    client = DuckDuckGoSearchClient(comm_manager=None)
+    http = AsyncMock()
+    http.get.return_value = _search_response(b'{"Results": [{"Text": "Python", "FirstURL": "http://py"}]}')
+    with patch.object(client, "_get_client", return_value=http):
+        first = await client.search_web("Python")
+        second = await client.search_web("  python ")
+        assert first == second
+        assert first["web"]["results"][0]["url"] == "http://py"
+        assert http.get.await_count == 1
+
+        # A different limit is a different cache entry
+        await client.search_web("python", limit=5)
+        assert http.get.await_count == 2
+
+        clock[0] += SEARCH_TTL
+        await client.search_web("python")
+        assert http.get.await_count == 3
+
+@pytest.mark.asyncio
+async def test_search_errors_are_not_cached():
+    client = DuckDuckGoSearchClient(comm_manager=None)
+    http = AsyncMock()
+    http.get.side_effect = RuntimeError("boom")
+    with patch.object(client, "_get_client", return_value=http):
+        assert "error" in await client.search_web("python")
+        assert "error" in await client.search_web("python")
+    assert http.get.await_count == 2
@@ -0,0 +1,40 @@
+# multi_agent_system/tests/test_weather_client.py
+
+import pytest
+from unittest.mock import AsyncMock
+from agents.weather_agent import weather_client
+from agents.weather_agent.weather_client import WeatherClient, CURRENT_TTL
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock("agents.weather_agent.weather_client")
+
+def test_cache_hit_and_expiry(clock):
+    client = WeatherClient(api_key="test", base_url="http://weather")
+    client._cache_put(("current", "paris"), {"temp": 20})
+    assert client._cache_get(("current", "paris"), ttl=CURRENT_TTL) == {"temp": 20}
+    clock[0] += CURRENT_TTL
+    assert client._cache_get(("current", "paris"), ttl=CURRENT_TTL) is None
+    assert ("current", "paris") not in client._cache
+
+def test_cache_evicts_least_recently_used(monkeypatch, clock):
+    monkeypatch.setattr(weather_client, "CACHE_MAX_ENTRIES", 2)
+    client = WeatherClient(api_key="test", base_url="http://weather")
+    client._cache_put(("current", "a"), {"n": 1})
+    client._cache_put(("current", "b"), {"n": 2})
+    client._cache_get(("current", "a"), ttl=CURRENT_TTL)  # "a" is now the most recent
+    client._cache_put(("current", "c"), {"n": 3})
+    assert list(client._cache) == [("current", "a"), ("current", "c")]
+
+@pytest.mark.asyncio
+async def test_current_weather_served_from_cache(clock):
+    client = WeatherClient(api_key="test", base_url="http://weather")
+    client._get = AsyncMock(return_value={"current": {"temp_c": 20}})
+    first = await client.get_current_weather("Paris")
+    second = await client.get_current_weather(" paris ")
+    assert first == second
+    client._get.assert_awaited_once()
+
+    clock[0] += CURRENT_TTL
+    await client.get_current_weather("Paris")
+    assert client._get.await_count == 2